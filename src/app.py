@@ -2,27 +2,33 @@ from __future__ import annotations
 
 import argparse
 import os
+import re
 import sys
 import typing
-from typing import Callable, Type
+from typing import Callable, Type, Optional
 
-from PyQt6.QtCore import QFile, QDir, QSettings, Qt, QCoreApplication
+from PyQt6.QtCore import QFile, QDir, QSettings, Qt, QCoreApplication, QStandardPaths
 from PyQt6.QtNetwork import QNetworkAccessManager, QHostAddress
 from PyQt6.QtWidgets import QWidget
 from pythonosc import udp_client
 
 from src.controller import Controller, ControllerRegistry
-from src.vrc_osc.avatar import Avatar
+from src.vrc_osc.avatar import Avatar, AvatarSchema, schema_cache
+from src.vrc_osc.config_watcher import OscConfigWatcher
 from src.my_translator import MyTranslator
 from src.ui.main_window import MainWindow
 from src.vrc_api import VRCApiService
 from src.ui.avatar_osc_remote_window import AvatarOSCRemoteWindow
-from src.vrc_osc.vrc_osc import VrcOscService, OscMessage
+from src.vrc_osc.router import OscRouter
+from src.vrc_osc.vrc_osc import VrcOscService, OscMessage, OSCValueType, AVATAR_CHANGE_ADDRESS
 
 from src.ui.avatar_controller_window import AvatarControllerWindow
 
 import logging
 
+_AVATAR_ID_PATTERN = re.compile(r"^[\w-]+$")
+
+
 class App:
     """
     Holds all singletons and a list of all windows. Responsible for wiring the dependencies.
@@ -47,8 +53,22 @@ class App:
                             help="Port to send osc messages to VRC", dest="port_out")
         parser.add_argument("--recv-port", type=int, default=9001,
                             help="Port to receive osc messages from VRC", dest="port_in")
+        parser.add_argument("--send-batch-ms", type=int, default=None,
+                            help="Collect outgoing parameter changes for this many milliseconds and send them as "
+                                 "OSC bundles. 0 batches everything changed within one event loop iteration.",
+                            dest="send_batch_ms")
+        parser.add_argument("--schedule-bundles", action="store_true",
+                            help="Hold back the messages of received OSC bundles until their timetag is due instead "
+                                 "of handling them right away.", dest="schedule_bundles")
+        parser.add_argument("--threaded-recv", action="store_true",
+                            help="Receive and decode OSC messages on a separate thread.", dest="threaded_recv")
+        parser.add_argument("--float-deadband", type=float, default=None,
+                            help="Only pass on received float parameters to the UI and controllers once they moved by "
+                                 "more than this. Defaults to 0.005, 0 passes on every change.",
+                            dest="float_deadband")
         parser.add_argument("--verbose", action="store_true", help="Enable debug mode")
         args = parser.parse_args()
+        self.float_deadband: Optional[float] = args.float_deadband
 
         # setup logger
         log_level = logging.DEBUG if args.verbose else logging.ERROR
@@ -62,9 +82,23 @@ class App:
         self.vrca: VRCApiService = VRCApiService(self.network_manager)
 
         self.osc_service: VrcOscService = VrcOscService()
-        self.osc_subscriber: set[Callable[[OscMessage], None]] = set()
-        self.osc_service.set_handler(self._osc_handler)
-        self.osc_service.connect(QHostAddress(args.ip_in), args.port_in, QHostAddress(args.ip_out), args.port_out)
+        self.osc_router: OscRouter = OscRouter()
+        self.osc_service.set_batch_handler(self._osc_batch_handler)
+        if args.send_batch_ms is not None:
+            self.osc_service.set_batching(True, args.send_batch_ms)
+        if args.schedule_bundles:
+            self.osc_service.set_bundle_scheduling(True)
+        self.osc_service.connect(QHostAddress(args.ip_in), args.port_in, QHostAddress(args.ip_out), args.port_out,
+                                 threaded=args.threaded_recv)
+        QCoreApplication.instance().aboutToQuit.connect(self.osc_service.close)
+        QCoreApplication.instance().aboutToQuit.connect(self.translator.close)
+        QCoreApplication.instance().aboutToQuit.connect(self.vrca.close)
+
+        # parsed avatar configs are reused by the next launch. Kept in the per-user cache directory, as the cache
+        # unpickles whatever it finds there.
+        schema_cache.cache_dir = os.path.join(
+            QStandardPaths.writableLocation(QStandardPaths.StandardLocation.CacheLocation), "avatar_schemas"
+        )
 
         self.controller_registry = ControllerRegistry()
         self.controller_registry.load_all_plugins(self.controller_registry.get_standard_plugins_location())
@@ -72,14 +106,61 @@ class App:
         # setup ui
         self.mw: MainWindow = MainWindow(self)
         self.vrca.logged_in.connect(self.mw.on_login)
+        self.subscribe_osc(self._on_avatar_change, AVATAR_CHANGE_ADDRESS)
+        self._awaited_avatar_id: str = ""
+        """Avatar VRChat switched to, whose OSC config wasn't written yet"""
+        self._pending_loads: dict[str, dict[object, Callable[[], None]]] = {}
+        """
+        Loads waiting for their OSC config to become readable, by path of the config and by whoever asked for them,
+        see _try_load_avatar
+        """
+        self.osc_config_watcher = OscConfigWatcher(self.get_osc_directory())
+        self.osc_config_watcher.config_changed.connect(self._on_avatar_config_changed)
+        QCoreApplication.instance().aboutToQuit.connect(self.osc_config_watcher.close)
+        # returns right away, the main window is refreshed once the login is done
         self.vrca.fast_login()
 
         self.mw.show()
 
+    def load_avatar(self, filename: str) -> Avatar:
+        """
+        Load the avatar from its OSC config file and route its parameter updates to it.
+        """
+        new_avatar = Avatar(self.osc_service)
+        new_avatar.load_vrchat_osc_file(filename)
+        if self.float_deadband is not None:
+            new_avatar.set_type_deadband(OSCValueType.FLOAT, self.float_deadband)
+        self.subscribe_avatar(new_avatar)
+        self.translator.warm_cache(new_avatar.param_map.keys())
+        return new_avatar
+
+    def _try_load_avatar(self, filename: str, requester: object, retry: Callable[[], None]) -> Optional[Avatar]:
+        """
+        Load the avatar, or call retry once VRChat finished writing its config if it isn't readable yet.
+        :param requester: only the last retry of every requester is kept, see cancel_pending_loads
+        """
+        try:
+            return self.load_avatar(filename)
+        except (OSError, ValueError) as e:
+            logging.warning(f"Couldn't read {filename}, trying again once it changes: {e}")
+            self._pending_loads.setdefault(os.path.abspath(filename), {})[requester] = retry
+            return None
+
+    def cancel_pending_loads(self, requester: object) -> None:
+        """
+        Drop all retries of the requester, e.g. because the window they were meant for was closed.
+        """
+        for filename, retries in list(self._pending_loads.items()):
+            retries.pop(requester, None)
+            if not retries:
+                del self._pending_loads[filename]
+
     def spawn_avatar_window(self, filename: str, parent: Callable[[QWidget], None] | None = None) -> None:
         if filename and QFile(filename).exists():
-            new_avatar = Avatar(self.osc_service)
-            new_avatar.load_vrchat_osc_file(filename)
+            new_avatar = self._try_load_avatar(filename, AvatarOSCRemoteWindow,
+                                               lambda: self.spawn_avatar_window(filename, parent))
+            if new_avatar is None:
+                return
             new_window = AvatarOSCRemoteWindow(self, new_avatar)
             self.avatar_windows.append(new_window)
             if parent is None:
@@ -87,31 +168,115 @@ class App:
             else:
                 parent(new_window)
 
-    def spawn_controller_window(self, filename: str, controller: Type[Controller], parent: Callable[[QWidget], None]):
+    def spawn_controller_window(self, filename: str, controller: Type[Controller],
+                                parent: Callable[[QWidget], None] | None = None):
         if filename and QFile(filename).exists():
-            new_avatar = Avatar(self.osc_service)
-            new_avatar.load_vrchat_osc_file(filename)
+            new_avatar = self._try_load_avatar(filename, controller,
+                                               lambda: self.spawn_controller_window(filename, controller, parent))
+            if new_avatar is None:
+                return
             new_window = AvatarControllerWindow(self, new_avatar, controller)
             self.avatar_controller.append(new_window)
             new_window.show()
 
+    def switch_avatar_window(self, window: AvatarOSCRemoteWindow, filename: str) -> None:
+        """
+        Show another avatar in an existing remote window.
+        """
+        new_avatar = self._try_load_avatar(filename, window, lambda: self.switch_avatar_window(window, filename))
+        if new_avatar is None:
+            return
+        if window.central_widget is not None:
+            self.unsubscribe_avatar(window.central_widget.avatar)
+        window.set_avatar(new_avatar)
+
+    def subscribe_osc(self, handler: Callable[[OscMessage], None], address: str = "*"):
+        """
+        :param address: exact OSC address or a prefix ending in "*", see OscRouter
+        """
+        self.osc_router.subscribe(handler, address)
+
+    def unsubscribe_osc(self, handler: Callable[[OscMessage], None], address: str = "*"):
+        self.osc_router.unsubscribe(handler, address)
+
+    def subscribe_avatar(self, avatar: Avatar) -> None:
+        """
+        Route the updates of all parameters of the avatar to it. All updates received together, e.g. the messages of a
+        bundle, are applied at once, see Avatar.apply_many.
+        """
+        self.osc_router.subscribe_batch(avatar.receive_osc_messages, avatar.osc_map.keys())
+
+    def unsubscribe_avatar(self, avatar: Avatar) -> None:
+        self.osc_router.unsubscribe_batch(avatar.receive_osc_messages, avatar.osc_map.keys())
+
+    def _osc_batch_handler(self, msgs: list[OscMessage]) -> None:
+        self.osc_router.dispatch_many(msgs)
+
+    def _on_avatar_change(self, msg: OscMessage) -> None:
+        _, osc_type, avatar_id = msg
+        if osc_type != OSCValueType.STRING or not _AVATAR_ID_PATTERN.match(avatar_id):
+            logging.warning(f"Ignoring avatar change to {avatar_id!r}")
+            return
+        filename = self.find_avatar_osc_file(avatar_id)
+        if filename is None:
+            # VRChat writes the config while loading the avatar, see _on_avatar_config_changed
+            logging.info(f"Waiting for the OSC config of avatar {avatar_id}")
+            self._awaited_avatar_id = avatar_id
+            return
+        self._awaited_avatar_id = ""
+        self.mw.switch_avatar(avatar_id, filename)
+
+    def _on_avatar_config_changed(self, filename: str, schema: AvatarSchema) -> None:
+        """
+        Called by the OscConfigWatcher once VRChat wrote an OSC config. Opens what was waiting for it and updates all
+        open avatars loaded from it.
+        """
+        for retry in self._pending_loads.pop(filename, {}).values():
+            retry()
+        if self._awaited_avatar_id and os.path.basename(filename) == self._awaited_avatar_id + ".json":
+            avatar_id, self._awaited_avatar_id = self._awaited_avatar_id, ""
+            self.mw.switch_avatar(avatar_id, filename)
 
-    def subscribe_osc(self, handler: Callable[[OscMessage], None]):
-        self.osc_subscriber.add(handler)
+        for window in self.avatar_windows:
+            widget = window.central_widget
+            if widget is None or widget.avatar.filename != filename or widget.avatar.schema is schema:
+                continue
+            # the widget holds views of the old schema, rebuild it
+            widget.release()
+            self._update_avatar_schema(widget.avatar, schema)
+            window.set_avatar(widget.avatar)
+        for window in self.avatar_controller:
+            if window.avatar.filename == filename and window.avatar.schema is not schema:
+                self._update_avatar_schema(window.avatar, schema)
 
-    def unsubscribe_osc(self, handler: Callable[[OscMessage], None]):
-        self.osc_subscriber.remove(handler)
+    def _update_avatar_schema(self, avatar: Avatar, schema: AvatarSchema) -> None:
+        self.unsubscribe_avatar(avatar)
+        avatar.update_schema(schema)
+        self.subscribe_avatar(avatar)
+        self.translator.warm_cache(avatar.param_map.keys())
 
-    def _osc_handler(self, msg: OscMessage) -> None:
-        for handler in self.osc_subscriber:
-            try:
-                handler(msg)
-            except Exception as e:
-                print("Error while dispatching OSC Message")
-                print(e)
+    def find_avatar_osc_file(self, avatar_id: str) -> Optional[str]:
+        """
+        VRChat writes the OSC config of every avatar to <OSC directory>/<user id>/Avatars/<avatar id>.json. The
+        directory of the logged-in user is searched first, then those of all other users.
+        :return: path of the config or None if there is none
+        """
+        osc_dir = self.get_osc_directory()
+        user_ids = []
+        if self.vrca.current_user is not None:
+            user_ids.append(self.vrca.current_user.id)
+        try:
+            user_ids += [entry for entry in os.listdir(osc_dir) if entry not in user_ids]
+        except OSError:
+            pass
+        for user_id in user_ids:
+            filename = os.path.join(osc_dir, user_id, "Avatars", avatar_id + ".json")
+            if os.path.isfile(filename):
+                return filename
+        return None
 
     @staticmethod
     def get_osc_directory() -> str:
         # TODO: Consider making it multiplatform
-        osc_dir = QDir(os.environ["APPDATA"] + "\\..\\LocalLow\\VRChat\\VRChat\\OSC\\")
+        osc_dir = QDir(os.environ.get("APPDATA", "") + "\\..\\LocalLow\\VRChat\\VRChat\\OSC\\")
         return osc_dir.absolutePath()
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Optional, Callable
+
+from PyQt6.QtGui import QImage
+
+
+class AvatarData:
+    def __init__(self):
+        self.id: str = ""
+        self.name: str = ""
+        self.user: str = ""
+        self.img: Optional[QImage] = None
+        self.thumbnail_url: str = ""
+        self.thumbnail: Optional[bytes] = None
+        """Encoded thumbnail, img is decoded from it"""
+        self.etag: str = ""
+        self.last_modified: str = ""
+        """Validators of the thumbnail, sent along when it is downloaded again"""
+        self.fetched_at: float = 0.0
+        """When the data was last fetched or confirmed to be unchanged"""
+
+
+class AvatarCache:
+    """
+    sqlite backed cache of avatar names and thumbnails, keyed by avatar id.
+
+    The database holds at most max_bytes of thumbnails, the least recently used avatars are dropped first. The last
+    max_memory_entries avatars are also kept in memory together with their decoded QImage, so switching back to one of
+    them neither touches the disk nor decodes the thumbnail again.
+
+    Entries younger than max_age seconds are fresh and can be used as they are. Older entries have to be revalidated,
+    see AvatarData.etag.
+    """
+    def __init__(self, filename: str, max_bytes: int = 32 * 1024 * 1024, max_memory_entries: int = 64,
+                 max_age: float = 3600.0, clock: Callable[[], float] = time.time):
+        self.memory: OrderedDict[str, AvatarData] = OrderedDict()
+        self.max_bytes = max_bytes
+        self.max_memory_entries = max_memory_entries
+        self.max_age = max_age
+        self.clock = clock
+        self.con = sqlite3.connect(filename)
+        self.con.execute("PRAGMA journal_mode=WAL")
+        self.con.execute(
+            """
+CREATE TABLE IF NOT EXISTS avatar_cache(
+    id TEXT NOT NULL PRIMARY KEY,
+    name TEXT NOT NULL,
+    thumbnail_url TEXT NOT NULL,
+    thumbnail BLOB,
+    etag TEXT NOT NULL,
+    last_modified TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    last_used REAL NOT NULL,
+    size INTEGER NOT NULL
+) WITHOUT ROWID;
+            """
+        )
+        self.con.commit()
+
+    def get(self, avatar_id: str) -> Optional[AvatarData]:
+        """
+        :return: the cached avatar, fresh or not, or None if it isn't cached
+        """
+        data = self.memory.get(avatar_id)
+        if data is None:
+            row = self.con.execute(
+                "SELECT name, thumbnail_url, thumbnail, etag, last_modified, fetched_at FROM avatar_cache WHERE id = ?",
+                (avatar_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            data = AvatarData()
+            data.id = avatar_id
+            data.name, data.thumbnail_url, data.thumbnail, data.etag, data.last_modified, data.fetched_at = row
+            if data.thumbnail is not None:
+                data.img = QImage.fromData(data.thumbnail)
+        self._remember(data)
+        self.con.execute("UPDATE avatar_cache SET last_used = ? WHERE id = ?", (self.clock(), avatar_id))
+        self.con.commit()
+        return data
+
+    def is_fresh(self, data: AvatarData) -> bool:
+        return self.clock() - data.fetched_at < self.max_age
+
+    def store(self, data: AvatarData) -> None:
+        """
+        Cache the avatar as fetched right now and drop the least recently used avatars beyond max_bytes.
+        """
+        now = self.clock()
+        data.fetched_at = now
+        self._remember(data)
+        self.con.execute(
+            """
+INSERT OR REPLACE INTO avatar_cache(id, name, thumbnail_url, thumbnail, etag, last_modified, fetched_at, last_used, size)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?);
+            """,
+            (data.id, data.name, data.thumbnail_url, data.thumbnail, data.etag, data.last_modified, now, now,
+             len(data.thumbnail or b""))
+        )
+        evicted = self.con.execute(
+            """
+SELECT id FROM (SELECT id, SUM(size) OVER (ORDER BY last_used DESC, id) AS total FROM avatar_cache)
+WHERE total > ?;
+            """,
+            (self.max_bytes,)
+        ).fetchall()
+        self.con.executemany("DELETE FROM avatar_cache WHERE id = ?", evicted)
+        self.con.commit()
+        for (avatar_id,) in evicted:
+            self.memory.pop(avatar_id, None)
+
+    def _remember(self, data: AvatarData) -> None:
+        self.memory[data.id] = data
+        self.memory.move_to_end(data.id)
+        if len(self.memory) > self.max_memory_entries:
+            self.memory.popitem(last=False)
+
+    def close(self) -> None:
+        self.con.close()
@@ -1,49 +1,218 @@
 from __future__ import annotations
 
+import json
+import logging
 import sqlite3
-from typing import Callable, Optional
+from collections import OrderedDict
+from typing import Callable, Optional, Iterable
 
-import translate
-from PyQt6.QtCore import QObject, pyqtSignal, QRunnable, pyqtSlot, QThreadPool
+from PyQt6.QtCore import QObject, pyqtSignal, QRunnable, pyqtSlot, QThreadPool, QTimer
 from PyQt6.QtGui import QAction
 
+from src import utils
+from src.translation_backends import TranslationBackend, RemoteTranslatorBackend, GlossaryBackend
+
+log = logging.getLogger(__name__)
+
 
 class _TranslationTaskSignals(QObject):
     done = pyqtSignal(object)
+    failed = pyqtSignal(object)
 
 
 class _TranslationTask(QRunnable):
-    def __init__(self, phrase, tl):
+    """
+    Translates a batch of phrases with TranslationBackend.translate_batch.
+    The done signal is emitted with a list of (phrase, translation) pairs, where the translation is None for phrases
+    the backend couldn't translate. The failed signal is emitted with the list of phrases.
+    """
+    def __init__(self, phrases: list[str], backend: TranslationBackend, from_lang: str, to_lang: str):
         super().__init__()
-        self.phrase = phrase
-        self.tl = tl
+        self.phrases = phrases
+        self.backend = backend
+        self.from_lang = from_lang
+        self.to_lang = to_lang
         self.signals = _TranslationTaskSignals()
 
     @pyqtSlot()
     def run(self):
-        self.signals.done.emit(self.tl.translate(self.phrase))
+        try:
+            translations = self.backend.translate_batch(self.phrases, self.from_lang, self.to_lang)
+        except Exception as e:
+            log.error(f"Translating {len(self.phrases)} phrases failed: {e}")
+            self.signals.failed.emit(self.phrases)
+            return
+        self.signals.done.emit(list(zip(self.phrases, translations)))
+
+
+class TranslationCache:
+    """
+    sqlite backed cache of translations, keyed by (phrase, from_lang, to_lang).
+
+    New translations are written right away but only committed in batches, after commit_interval_ms or once
+    max_pending translations are waiting, whichever comes first. The database runs in WAL mode, so commits are cheap
+    and don't block readers.
+
+    In front of the database sits an in-memory LRU of the last max_memory_entries translations. Hits in it never touch
+    the database.
+    """
+    SCHEMA_VERSION = 2
+
+    def __init__(self, filename: str, commit_interval_ms: int = 1000, max_pending: int = 64,
+                 max_memory_entries: int = 4096):
+        self.memory: OrderedDict[tuple[str, str, str], str] = OrderedDict()
+        self.max_memory_entries = max_memory_entries
+        self.hits: int = 0
+        """Lookups answered from memory"""
+        self.misses: int = 0
+        """Lookups that had to query the database, whether the phrase was found there or not"""
+        self.con = sqlite3.connect(filename)
+        self.con.execute("PRAGMA journal_mode=WAL")
+        self.con.execute("PRAGMA synchronous=NORMAL")
+        self._migrate()
+        self.max_pending = max_pending
+        self._pending = 0
+        self._commit_timer = QTimer()
+        self._commit_timer.setSingleShot(True)
+        self._commit_timer.setInterval(commit_interval_ms)
+        self._commit_timer.timeout.connect(self.commit)
+
+    def _migrate(self) -> None:
+        """
+        Version 0 was a table without any key, which meant a full scan for every lookup and a new row for every
+        translation, even for phrases that were already cached. Its rows are moved over, the latest translation wins.
+
+        Up to version 1, Japanese was cached as "jp" instead of "ja". Those rows are renamed unless a "ja" row for the
+        phrase exists already.
+        """
+        version = self.con.execute("PRAGMA user_version").fetchone()[0]
+        if version >= self.SCHEMA_VERSION:
+            return
+        self.con.execute("BEGIN")
+        if version < 1:
+            self._migrate_unkeyed_table()
+        if version < 2:
+            self.con.execute("UPDATE OR IGNORE translation_cache SET from_lang = 'ja' WHERE from_lang = 'jp'")
+            self.con.execute("DELETE FROM translation_cache WHERE from_lang = 'jp'")
+        self.con.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+        self.con.commit()
+
+    def _migrate_unkeyed_table(self) -> None:
+        old_table_exists = self.con.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'translation_cache'"
+        ).fetchone() is not None
+        if old_table_exists:
+            self.con.execute("ALTER TABLE translation_cache RENAME TO translation_cache_v0")
+        self.con.execute(
+            """
+CREATE TABLE translation_cache(
+    phrase TEXT NOT NULL,
+    from_lang TEXT NOT NULL,
+    to_lang TEXT NOT NULL,
+    translation TEXT NOT NULL,
+    PRIMARY KEY (phrase, from_lang, to_lang)
+) WITHOUT ROWID;
+            """
+        )
+        if old_table_exists:
+            self.con.execute(
+                """
+INSERT OR REPLACE INTO translation_cache(phrase, from_lang, to_lang, translation)
+SELECT phrase, from_lang, to_lang, translation FROM translation_cache_v0
+WHERE phrase IS NOT NULL AND from_lang IS NOT NULL AND to_lang IS NOT NULL AND translation IS NOT NULL
+ORDER BY rowid;
+                """
+            )
+            self.con.execute("DROP TABLE translation_cache_v0")
+
+    def lookup(self, phrase: str, from_lang: str, to_lang: str) -> Optional[str]:
+        key = (phrase, from_lang, to_lang)
+        translation = self.memory.get(key)
+        if translation is not None:
+            self.hits += 1
+            self.memory.move_to_end(key)
+            return translation
+
+        self.misses += 1
+        row = self.con.execute(
+            "SELECT translation FROM translation_cache WHERE phrase = ? AND from_lang = ? AND to_lang = ?",
+            key
+        ).fetchone()
+        if row is None:
+            return None
+        self._remember(key, row[0])
+        return row[0]
+
+    def warm(self, phrases: Iterable[str], from_lang: str, to_lang: str) -> None:
+        """
+        Load the cached translations of all given phrases into memory with a single query.
+        """
+        rows = self.con.execute(
+            """
+SELECT phrase, translation FROM translation_cache
+WHERE from_lang = ? AND to_lang = ? AND phrase IN (SELECT value FROM json_each(?));
+            """,
+            (from_lang, to_lang, json.dumps(list(phrases)))
+        )
+        for phrase, translation in rows:
+            self._remember((phrase, from_lang, to_lang), translation)
+
+    def _remember(self, key: tuple[str, str, str], translation: str) -> None:
+        self.memory[key] = translation
+        self.memory.move_to_end(key)
+        if len(self.memory) > self.max_memory_entries:
+            self.memory.popitem(last=False)
+
+    def store(self, phrase: str, translation: str, from_lang: str, to_lang: str) -> None:
+        self._remember((phrase, from_lang, to_lang), translation)
+        self.con.execute(
+            "INSERT OR REPLACE INTO translation_cache(phrase, from_lang, to_lang, translation) VALUES (?, ?, ?, ?)",
+            (phrase, from_lang, to_lang, translation)
+        )
+        self._pending += 1
+        if self._pending >= self.max_pending:
+            self.commit()
+        elif not self._commit_timer.isActive():
+            self._commit_timer.start()
+
+    def commit(self) -> None:
+        self._commit_timer.stop()
+        self._pending = 0
+        self.con.commit()
+
+    def close(self) -> None:
+        self.commit()
+        self.con.close()
 
 
 class MyTranslator:
     from_lang: str
     to_lang: str
-    tl: translate.Translator
+    backends: list[TranslationBackend]
     set_from_zh_action: QAction
     set_from_ko_action: QAction
     set_from_jp_action: QAction
     set_from_auto_action: QAction
     TRANSLATION_ERROR_SAME_LANGUAGE = "PLEASE SELECT TWO DISTINCT LANGUAGES"
+    MAX_BATCH_PHRASES = 16
+    MAX_BATCH_CHARS = 450
+    """The default translation provider rejects requests longer than 500 characters"""
+    MAX_CONCURRENT_REQUESTS = 4
 
     def __init__(self):
         self.from_lang = 'zh'
         self.to_lang = 'en'
-        self.tl = (translate.Translator(from_lang=self.from_lang, to_lang=self.to_lang))
+        self.backends = [GlossaryBackend(), RemoteTranslatorBackend()]
+        """
+        Tried in order. Local backends are asked right away, the first other backend gets everything they couldn't
+        translate.
+        """
 
         self.set_from_zh_action = QAction("Translate from Chinese")
         self.set_from_zh_action.triggered.connect(lambda: self._set_from_lang("zh"))
 
         self.set_from_jp_action = QAction("Translate from Japanese")
-        self.set_from_jp_action.triggered.connect(lambda: self._set_from_lang("jp"))
+        self.set_from_jp_action.triggered.connect(lambda: self._set_from_lang("ja"))
 
         self.set_from_ko_action = QAction("Translate from Korean")
         self.set_from_ko_action.triggered.connect(lambda: self._set_from_lang("ko"))
@@ -51,55 +220,158 @@ class MyTranslator:
         self.set_from_auto_action = QAction("Translate from Auto-Detect")
         self.set_from_auto_action.triggered.connect(lambda: self._set_from_lang("autodetect"))
 
-        self.con = sqlite3.connect('translations.sqlite3')
-        self.con.execute(
-            """
-CREATE TABLE IF NOT EXISTS translation_cache(phrase, translation, from_lang, to_lang);
-            """
-        )
+        self.segment_mode = False
+        """Translate every CJK segment of a parameter name on its own, see utils.split_name_segments"""
+        self.segment_mode_action = QAction("Translate Name Segments Separately")
+        self.segment_mode_action.setCheckable(True)
+        self.segment_mode_action.toggled.connect(self._set_segment_mode)
 
-        self.threadpool = QThreadPool()
+        self.cache = TranslationCache('translations.sqlite3')
 
-    def _recreate_translator(self):
-        self.tl = translate.Translator(
-            from_lang=self.from_lang,
-            to_lang=self.to_lang
-        )
+        self.threadpool = QThreadPool()
+        self.threadpool.setMaxThreadCount(self.MAX_CONCURRENT_REQUESTS)
+        self._in_flight: dict[tuple[str, str, str], list[Callable[[str], None]]] = {}
+        """Callbacks waiting for every phrase that is queued or being translated, by (phrase, from_lang, to_lang)"""
+        self._queued: list[tuple[str, str, str]] = []
+        """Phrases that are not yet handed to a _TranslationTask"""
+        self._dispatch_timer = QTimer()
+        self._dispatch_timer.setSingleShot(True)
+        self._dispatch_timer.setInterval(0)
+        self._dispatch_timer.timeout.connect(self._dispatch_queued)
 
     def _set_from_lang(self, from_lang: str):
         self.from_lang = from_lang
-        self._recreate_translator()
+
+    def add_backend(self, backend: TranslationBackend) -> None:
+        """
+        Register a backend in front of the existing ones.
+        """
+        self.backends.insert(0, backend)
+
+    def _set_segment_mode(self, enabled: bool):
+        self.segment_mode = enabled
 
     def translate(self, text: str,
-                  callback: Callable[[str], None]):
+                  callback: Callable[[str], None],
+                  from_lang: Optional[str] = None):
         """
         Translate the given text with the current settings of the translator.
 
-        Utilizes a sqlite cache and multithreading to prevent freezes
+        Utilizes a sqlite cache and multithreading to prevent freezes. Phrases requested within the same event loop
+        iteration are translated together in as few requests as possible.
         :param text: Phrase to be translated
         :param callback: callback function called when translation is done.
             It's only argument is the translated text.
+        :param from_lang: language of the text, e.g. from utils.source_language. Defaults to the selected language.
         :return: translated text
         """
-
-        cur = self.con.cursor()
-        cur.execute("SELECT translation FROM translation_cache WHERE phrase = ? AND from_lang = ? AND to_lang = ?",
-                    (text, self.from_lang, self.to_lang)
-                    )
-        translation = cur.fetchone()
-        # translation takes a second, so delegate it to another thread
-        if translation is None:
-            new_task = _TranslationTask(phrase=text, tl=self.tl)
-            new_task.signals.done.connect(
-                lambda trans: self._translate_callback(text, trans, self.from_lang, self.to_lang, callback)
-            )
-            self.threadpool.start(new_task)
+        from_lang = from_lang or self.from_lang
+        if self.segment_mode:
+            self._translate_segments(text, callback, from_lang)
         else:
-            callback(translation[0])
+            self._translate_phrase(text, callback, from_lang)
 
-    def _translate_callback(self, phrase, translation, from_lang, to_lang, callback):
-        self.con.execute("INSERT INTO translation_cache VALUES (?, ?, ?, ?)",
-                         (phrase, translation, from_lang, to_lang)
-                         )
-        self.con.commit()
-        callback(translation)
+    def _translate_segments(self, text: str, callback: Callable[[str], None], from_lang: str):
+        """
+        Translate and cache every unique CJK segment of text on its own and put the translated segments back together.
+        Parameter names are built from a small vocabulary, so most segments are already cached.
+        """
+        segments = utils.split_name_segments(text)
+        unique_segments = {segment for segment in segments if utils.contains_cjk(segment)}
+        if not unique_segments:
+            callback(text)
+            return
+        translated: dict[str, str] = {}
+
+        def receive(segment: str, translation: str):
+            translated[segment] = translation
+            if len(translated) == len(unique_segments):
+                callback(utils.join_name_segments(segments, translated))
+
+        for segment in unique_segments:
+            self._translate_phrase(segment, lambda translation, s=segment: receive(s, translation), from_lang)
+
+    def _translate_phrase(self, text: str, callback: Callable[[str], None], from_lang: str):
+        translation = self.cache.lookup(text, from_lang, self.to_lang)
+        if translation is not None:
+            callback(translation)
+            return
+        for backend in self.backends:
+            if backend.local:
+                translation = backend.translate(text, from_lang, self.to_lang)
+                if translation is not None:
+                    callback(translation)
+                    return
+
+        # the same phrase is translated only once, no matter how often it is requested
+        key = (text, from_lang, self.to_lang)
+        callbacks = self._in_flight.get(key)
+        if callbacks is not None:
+            callbacks.append(callback)
+            return
+        self._in_flight[key] = [callback]
+        self._queued.append(key)
+        # collect everything requested until control returns to the event loop and translate it in batches
+        if not self._dispatch_timer.isActive():
+            self._dispatch_timer.start()
+
+    def _dispatch_queued(self) -> None:
+        batches: dict[tuple[str, str], list[list[str]]] = {}
+        batch_chars: dict[tuple[str, str], int] = {}
+        queued, self._queued = self._queued, []
+        for phrase, from_lang, to_lang in queued:
+            languages = (from_lang, to_lang)
+            language_batches = batches.setdefault(languages, [[]])
+            chars = batch_chars.get(languages, 0) + len(phrase) + 1
+            if language_batches[-1] and (len(language_batches[-1]) >= self.MAX_BATCH_PHRASES
+                                         or chars > self.MAX_BATCH_CHARS):
+                language_batches.append([])
+                chars = len(phrase) + 1
+            language_batches[-1].append(phrase)
+            batch_chars[languages] = chars
+
+        backend = next((b for b in self.backends if not b.local), None)
+        if backend is None:
+            # offline only, nothing else is going to translate them
+            for key in queued:
+                self._in_flight.pop(key, None)
+            return
+
+        # translation takes a second, so delegate it to other threads
+        for (from_lang, to_lang), language_batches in batches.items():
+            for batch in language_batches:
+                new_task = _TranslationTask(batch, backend, from_lang, to_lang)
+                new_task.signals.done.connect(
+                    lambda results, f=from_lang, t=to_lang: self._translate_callback(results, f, t)
+                )
+                new_task.signals.failed.connect(
+                    lambda phrases, f=from_lang, t=to_lang: self._translate_failed(phrases, f, t)
+                )
+                self.threadpool.start(new_task)
+
+    def warm_cache(self, phrases: Iterable[str]) -> None:
+        """
+        Load the cached translations of the phrases for the current languages into memory, see TranslationCache.warm
+        """
+        phrases = set(phrases)
+        if self.segment_mode:
+            phrases.update(segment for phrase in phrases for segment in utils.split_name_segments(phrase)
+                           if utils.contains_cjk(segment))
+        self.cache.warm(phrases, self.from_lang, self.to_lang)
+
+    def close(self) -> None:
+        self.cache.close()
+
+    def _translate_callback(self, results: list[tuple[str, str]], from_lang: str, to_lang: str):
+        for phrase, translation in results:
+            callbacks = self._in_flight.pop((phrase, from_lang, to_lang), [])
+            if translation is None:
+                continue
+            self.cache.store(phrase, translation, from_lang, to_lang)
+            for callback in callbacks:
+                callback(translation)
+
+    def _translate_failed(self, phrases: list[str], from_lang: str, to_lang: str):
+        # forget the callbacks, so the phrases can be requested again
+        for phrase in phrases:
+            self._in_flight.pop((phrase, from_lang, to_lang), None)
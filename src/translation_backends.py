@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+from typing import Optional, Callable
+
+import translate
+
+from src import utils
+from src.translation_glossary import GLOSSARIES
+
+
+class TranslationBackend:
+    """
+    Something that translates phrases for MyTranslator.
+
+    Local backends have to answer immediately and are called on the GUI thread. All other backends are called from
+    worker threads.
+    """
+    local: bool = False
+
+    def translate(self, phrase: str, from_lang: str, to_lang: str) -> Optional[str]:
+        """
+        :return: the translation or None if this backend can't translate the phrase
+        """
+        raise NotImplementedError()
+
+    def translate_batch(self, phrases: list[str], from_lang: str, to_lang: str) -> list[Optional[str]]:
+        return [self.translate(phrase, from_lang, to_lang) for phrase in phrases]
+
+
+class RemoteTranslatorBackend(TranslationBackend):
+    """
+    Translates through translate.Translator, which needs network access and takes about a second per request.
+    """
+
+    def __init__(self, translator_factory: Callable[..., translate.Translator] = translate.Translator):
+        """
+        :param translator_factory: creates the translator for from_lang and to_lang, passed as keyword arguments
+        """
+        self.translator_factory = translator_factory
+        self._translators: dict[tuple[str, str], translate.Translator] = {}
+
+    def _translator(self, from_lang: str, to_lang: str) -> translate.Translator:
+        tl = self._translators.get((from_lang, to_lang))
+        if tl is None:
+            tl = self.translator_factory(from_lang=from_lang, to_lang=to_lang)
+            self._translators[(from_lang, to_lang)] = tl
+        return tl
+
+    def translate(self, phrase: str, from_lang: str, to_lang: str) -> Optional[str]:
+        return self._translator(from_lang, to_lang).translate(phrase)
+
+    def translate_batch(self, phrases: list[str], from_lang: str, to_lang: str) -> list[Optional[str]]:
+        """
+        Translates all phrases with a single request by putting every phrase on its own line. If the result doesn't
+        have one line per phrase, the phrases are translated one by one instead.
+        """
+        tl = self._translator(from_lang, to_lang)
+        translations = []
+        if len(phrases) > 1:
+            translations = tl.translate("\n".join(phrases)).split("\n")
+        if len(translations) != len(phrases):
+            translations = [tl.translate(phrase) for phrase in phrases]
+        return [translation.strip() for translation in translations]
+
+
+class GlossaryBackend(TranslationBackend):
+    """
+    Translates fully offline from glossaries of common terms. A phrase is only translated if every CJK run in it is a
+    glossary term on its own, so "VF35_衣服/开关" becomes "VF35_clothes/toggle". Runs made of several terms are left
+    to other backends, stringing together the translations of their parts reads like word salad ("关上" isn't
+    "off up").
+    """
+    local = True
+
+    def __init__(self, glossaries: dict[tuple[str, str], dict[str, str]] = GLOSSARIES):
+        """
+        :param glossaries: terms and their translation by (from_lang, to_lang)
+        """
+        self._glossaries: dict[tuple[str, str], dict[str, str]] = {}
+        for (from_lang, to_lang), glossary in glossaries.items():
+            self._glossaries.setdefault((from_lang, to_lang), {}).update(glossary)
+            # auto-detection can use every glossary into the target language
+            self._glossaries.setdefault(("autodetect", to_lang), {}).update(glossary)
+
+    def translate(self, phrase: str, from_lang: str, to_lang: str) -> Optional[str]:
+        glossary = self._glossaries.get((from_lang, to_lang))
+        if glossary is None:
+            return None
+        segments = utils.split_name_segments(phrase)
+        translated: dict[str, str] = {}
+        for segment in segments:
+            if segment in translated or not utils.contains_cjk(segment):
+                continue
+            translation = glossary.get(segment)
+            if translation is None:
+                return None
+            translated[segment] = translation
+        if not translated:
+            return None
+        return utils.join_name_segments(segments, translated)
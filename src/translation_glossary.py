@@ -0,0 +1,148 @@
+"""
+Terms that show up over and over in avatar parameter names, used by GlossaryBackend to translate without network
+access. A term is only used if it makes up a whole CJK run of a name, so compounds like "开关" need their own
+entry.
+"""
+
+ZH_EN: dict[str, str] = {
+    # clothing
+    "衣服": "clothes",
+    "上衣": "top",
+    "外套": "jacket",
+    "衬衫": "shirt",
+    "裙子": "skirt",
+    "短裙": "short skirt",
+    "长裙": "long skirt",
+    "连衣裙": "dress",
+    "裤子": "pants",
+    "短裤": "shorts",
+    "袜子": "socks",
+    "丝袜": "stockings",
+    "鞋子": "shoes",
+    "鞋": "shoes",
+    "靴子": "boots",
+    "帽子": "hat",
+    "手套": "gloves",
+    "围巾": "scarf",
+    "腰带": "belt",
+    "内衣": "underwear",
+    "胸罩": "bra",
+    "内裤": "panties",
+    "泳衣": "swimsuit",
+    "睡衣": "pajamas",
+    "口罩": "face mask",
+    "面具": "mask",
+    # accessories
+    "眼镜": "glasses",
+    "项圈": "collar",
+    "项链": "necklace",
+    "耳环": "earrings",
+    "发饰": "hair accessory",
+    "蝴蝶结": "bow",
+    "背包": "backpack",
+    "包": "bag",
+    "手机": "phone",
+    "武器": "weapon",
+    "剑": "sword",
+    "枪": "gun",
+    # body
+    "身体": "body",
+    "皮肤": "skin",
+    "头发": "hair",
+    "发型": "hairstyle",
+    "长发": "long hair",
+    "短发": "short hair",
+    "刘海": "bangs",
+    "马尾": "ponytail",
+    "双马尾": "twin tails",
+    "眼睛": "eyes",
+    "瞳孔": "pupils",
+    "眉毛": "eyebrows",
+    "睫毛": "eyelashes",
+    "耳朵": "ears",
+    "猫耳": "cat ears",
+    "兽耳": "animal ears",
+    "尾巴": "tail",
+    "翅膀": "wings",
+    "角": "horns",
+    "脸": "face",
+    "嘴": "mouth",
+    "舌头": "tongue",
+    "牙齿": "teeth",
+    "胸": "chest",
+    "胸部": "chest",
+    "手": "hands",
+    "腿": "legs",
+    "脚": "feet",
+    "指甲": "nails",
+    "纹身": "tattoo",
+    # face
+    "表情": "expression",
+    "脸红": "blush",
+    "腮红": "blush",
+    "眼泪": "tears",
+    "微笑": "smile",
+    "生气": "angry",
+    "哭": "cry",
+    "口红": "lipstick",
+    "妆": "makeup",
+    # animals
+    "狐狸": "fox",
+    "猫": "cat",
+    "狗": "dog",
+    "兔子": "rabbit",
+    # colors
+    "颜色": "color",
+    "红色": "red",
+    "蓝色": "blue",
+    "绿色": "green",
+    "黑色": "black",
+    "白色": "white",
+    "黄色": "yellow",
+    "粉色": "pink",
+    "紫色": "purple",
+    "灰色": "gray",
+    "金色": "gold",
+    "银色": "silver",
+    # controls
+    "开关": "toggle",
+    "切换": "switch",
+    "显示": "show",
+    "隐藏": "hide",
+    "开": "on",
+    "关": "off",
+    "模式": "mode",
+    "重置": "reset",
+    "全部": "all",
+    "选择": "select",
+    "大小": "size",
+    "长度": "length",
+    "材质": "material",
+    "左": "left",
+    "右": "right",
+    "上": "up",
+    "下": "down",
+    "前": "front",
+    "后": "back",
+    # effects and actions
+    "特效": "effects",
+    "粒子": "particles",
+    "光": "light",
+    "发光": "glow",
+    "阴影": "shadow",
+    "音乐": "music",
+    "声音": "sound",
+    "动作": "action",
+    "舞蹈": "dance",
+    "坐": "sit",
+    "躺": "lie down",
+    "跑": "run",
+    "走": "walk",
+    "跳": "jump",
+    "飞": "fly",
+}
+
+GLOSSARIES: dict[tuple[str, str], dict[str, str]] = {
+    ("zh", "en"): ZH_EN,
+}
+"""All bundled glossaries by (from_lang, to_lang)"""
@@ -1,7 +1,6 @@
 import typing
 from typing import Type
 
-from src.my_translator import MyTranslator
 from src.ui.base_window import BaseWindow
 from src.vrc_osc.avatar import Avatar
 import src.app
@@ -9,8 +8,9 @@ import src.controller
 
 
 class AvatarControllerWindow(BaseWindow):
-    def __init__(self, my_translator: MyTranslator, avatar: Avatar, controller: Type[src.controller.Controller]):
-        super().__init__(my_translator)
+    def __init__(self, app, avatar: Avatar, controller: Type[src.controller.Controller]):
+        super().__init__(app.translator)
+        self.app = app
 
         self.avatar = avatar
         self.setWindowTitle(avatar.avatar_name + " Controller")
@@ -18,3 +18,8 @@ class AvatarControllerWindow(BaseWindow):
         self.controller = controller(avatar, parent=self)
         self.central_widget = self.controller
 
+    def closeEvent(self, event):
+        if self in self.app.avatar_controller:
+            self.app.avatar_controller.remove(self)
+            self.app.unsubscribe_avatar(self.avatar)
+        super().closeEvent(event)
@@ -28,7 +28,7 @@ class AvatarOSCRemoteWindow(src.ui.base_window.BaseWindow):
     """
     The window that contains the OSC remote controls and views.
     """
-    translate_all_chinese: QAction
+    translate_all_cjk: QAction
     central_widget: AvatarWidget | None
 
     def __init__(self, app, avatar: Avatar):
@@ -41,30 +41,45 @@ class AvatarOSCRemoteWindow(src.ui.base_window.BaseWindow):
         self.filter_menu = menu_bar.addMenu("Filter")
         self.filter_actions = list()
 
-        self.translate_all_chinese = QAction("Translate all chinese")
-        self.translate_all_chinese.triggered.connect(self.translate_all_chinese_action)
-        self.tool_menu.addAction(self.translate_all_chinese)
+        self.translate_all_cjk = QAction("Translate all Chinese, Japanese and Korean")
+        self.translate_all_cjk.triggered.connect(self.translate_all_cjk_action)
+        self.tool_menu.addAction(self.translate_all_cjk)
 
         self.set_avatar(avatar)
 
     def closeEvent(self, event):
+        self.app.cancel_pending_loads(self)
+        if self in self.app.avatar_windows:
+            self.app.avatar_windows.remove(self)
+        if self.central_widget is not None:
+            self.app.unsubscribe_avatar(self.central_widget.avatar)
+            self.central_widget.release()
+            # nothing to update anymore, see App._on_avatar_config_changed
+            self.central_widget = None
         super().closeEvent(event)
 
-    def translate_all_chinese_action(self):
+    def translate_all_cjk_action(self):
         if self.central_widget:
-            self.central_widget.translate_all_chinese()
+            self.central_widget.translate_all_cjk()
 
     def set_avatar(self, avatar: Avatar):
+        """
+        Show the avatar in a new AvatarWidget. The filters the user chose for the previous one stay active.
+        """
+        filter_states: dict[type, bool] = {}
         if self.central_widget is not None:
+            filter_states = {type(f): f.active for f in self.central_widget.filters}
             for tfqa in self.filter_actions:
                 self.filter_menu.removeAction(tfqa)
+            self.filter_actions = list()
+            self.central_widget.release()
 
         self.central_widget = AvatarWidget(self.app.translator, avatar)
 
         for f in self.central_widget.filters:
             f: _Filter
             new_tfqa = ToggleFilterQAction(self.central_widget, f)
-            new_tfqa.setChecked(f.default_state())
+            new_tfqa.setChecked(filter_states.get(type(f), f.default_state()))
             self.filter_actions.append(new_tfqa)
             self.filter_menu.addAction(new_tfqa)
 
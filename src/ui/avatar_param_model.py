@@ -0,0 +1,318 @@
+from __future__ import annotations
+
+import enum
+import re
+from typing import Any, Callable, Optional
+
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex, QSortFilterProxyModel, QObject, QEvent
+from PyQt6.QtWidgets import QStyledItemDelegate, QStyleOptionButton, QStyle, QApplication, QStyleOptionViewItem
+
+import src.my_translator
+from src.ui.display_throttle import DisplayThrottle
+from src.vrc_osc.avatar import Avatar, AvatarParam, OSCValueType
+
+
+class ParamFeature(enum.IntFlag):
+    """
+    Properties of a parameter that filters can test for. They are computed once per parameter, so applying a filter is
+    a bitmask test instead of a regex match.
+    """
+    CONTROLLABLE = enum.auto()
+    """VRChat accepts OSC messages for it"""
+    SELECTED = enum.auto()
+    """Selected by the user"""
+    SYSTEM_PREFIX = enum.auto()
+    """Belongs to a prefab like GoGoLoco, optionally prefixed by VRCFury"""
+    TRANSLATED = enum.auto()
+    """Has a translation"""
+
+
+_SYSTEM_PREFIX_PATTERN = re.compile(r"^(?:VF\d+_)?(?:Go/|OGB/|DexClone_|FaceEmo_|SB/)")
+
+
+def param_features(param: AvatarParam) -> ParamFeature:
+    features = ParamFeature(0)
+    if param.input_address:
+        features |= ParamFeature.CONTROLLABLE
+    if param.selected:
+        features |= ParamFeature.SELECTED
+    if _SYSTEM_PREFIX_PATTERN.match(param.name):
+        features |= ParamFeature.SYSTEM_PREFIX
+    if param.translation:
+        features |= ParamFeature.TRANSLATED
+    return features
+
+
+class AvatarParamTableModel(QAbstractTableModel):
+    """
+    Table of all parameters of an avatar, one row per parameter. The rows never change order, sorting and filtering is
+    done by AvatarParamFilterProxyModel. Value updates are collected and repainted at the rate of the display throttle.
+    """
+    COLUMN_TRANSLATE = 0
+    COLUMN_SELECTED = 1
+    COLUMN_NAME = 2
+    COLUMN_TYPE = 3
+    COLUMN_VALUE = 4
+    COLUMN_SET0 = 5
+    COLUMN_SET1 = 6
+    COLUMN_COUNT = 7
+
+    PARAM_ROLE = Qt.ItemDataRole.UserRole
+    """Role to get the AvatarParam of a row"""
+
+    _button_texts = {
+        COLUMN_TRANSLATE: "Translate",
+        COLUMN_SET0: "0",
+        COLUMN_SET1: "1",
+    }
+
+    def __init__(self,
+                 avatar: Avatar,
+                 translator: Callable[[str, Callable[[str], None], Optional[str]], None],
+                 display_throttle: Optional[DisplayThrottle] = None,
+                 parent: QObject | None = None):
+        """
+        :param translator: called with a name, a callback for its translation and the language of the name, which is
+            None to use the selected language
+        :param display_throttle: if given, value updates are displayed at its rate instead of immediately
+        """
+        super().__init__(parent)
+        self.translator = translator
+        self.display_throttle = display_throttle
+        self.params: list[AvatarParam] = list(avatar.param_map.values())
+        self.features: list[int] = [int(param_features(param)) for param in self.params]
+        """ParamFeature bits of every row, kept up to date when selection or translation change"""
+        self.name_rank: list[int] = [0] * len(self.params)
+        """Position of every row when sorted by name"""
+        for rank, row in enumerate(sorted(range(len(self.params)), key=lambda r: self.params[r].name)):
+            self.name_rank[row] = rank
+        self._dirty_rows: set[int] = set()
+        self._value_subscribers: list[Callable[[Any], None]] = []
+        for row, param in enumerate(self.params):
+            subscriber = lambda _, r=row: self._mark_value_dirty(r)
+            self._value_subscribers.append(subscriber)
+            param.subscribe(subscriber)
+
+    def release(self) -> None:
+        """
+        Stop listening to value updates. Call this before dropping the model.
+        """
+        for param, subscriber in zip(self.params, self._value_subscribers):
+            param.unsubscribe(subscriber)
+        self._value_subscribers = []
+        if self.display_throttle is not None:
+            self.display_throttle.discard(self._emit_dirty_rows)
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.params)
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else self.COLUMN_COUNT
+
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole) -> Any:
+        if not index.isValid():
+            return None
+        param = self.params[index.row()]
+        column = index.column()
+        match role:
+            case Qt.ItemDataRole.DisplayRole:
+                match column:
+                    case self.COLUMN_NAME:
+                        return self._label_text(param)
+                    case self.COLUMN_TYPE:
+                        return OSCValueType.single_letter.get(param.osc_type, "?")
+                    case self.COLUMN_VALUE:
+                        return self._value_text(param)
+                    case _:
+                        return self._button_texts.get(column)
+            case Qt.ItemDataRole.EditRole:
+                if column == self.COLUMN_VALUE:
+                    return self._value_text(param)
+            case Qt.ItemDataRole.CheckStateRole:
+                if column == self.COLUMN_SELECTED:
+                    return Qt.CheckState.Checked if param.selected else Qt.CheckState.Unchecked
+            case Qt.ItemDataRole.ToolTipRole:
+                if column == self.COLUMN_NAME:
+                    return param.name
+            case self.PARAM_ROLE:
+                return param
+        return None
+
+    def setData(self, index: QModelIndex, value: Any, role: int = Qt.ItemDataRole.EditRole) -> bool:
+        if not index.isValid():
+            return False
+        param = self.params[index.row()]
+        if index.column() == self.COLUMN_SELECTED and role == Qt.ItemDataRole.CheckStateRole:
+            param.selected = Qt.CheckState(value) == Qt.CheckState.Checked
+            self._set_feature(index.row(), ParamFeature.SELECTED, param.selected)
+            self.dataChanged.emit(index, index, [role])
+            return True
+        if index.column() == self.COLUMN_VALUE and role == Qt.ItemDataRole.EditRole:
+            param.value = self._parse_value(param, str(value))
+            return True
+        return False
+
+    def flags(self, index: QModelIndex) -> Qt.ItemFlag:
+        flags = super().flags(index)
+        match index.column():
+            case self.COLUMN_SELECTED:
+                flags |= Qt.ItemFlag.ItemIsUserCheckable
+            case self.COLUMN_VALUE:
+                flags |= Qt.ItemFlag.ItemIsEditable
+        return flags
+
+    def headerData(self, section: int, orientation: Qt.Orientation,
+                   role: int = Qt.ItemDataRole.DisplayRole) -> Any:
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            match section:
+                case self.COLUMN_NAME:
+                    return "Parameter"
+                case self.COLUMN_TYPE:
+                    return "T"
+                case self.COLUMN_VALUE:
+                    return "Value"
+            return ""
+        return None
+
+    def increment(self, row: int) -> None:
+        param = self.params[row]
+        match param.osc_type:
+            case OSCValueType.FLOAT:
+                param.value = 1.0
+            case OSCValueType.BOOL:
+                param.value = True
+            case OSCValueType.INT:
+                # increase by one and wrap around
+                param.value = 0 if int(param.value) == 255 else int(param.value) + 1
+
+    def decrement(self, row: int) -> None:
+        param = self.params[row]
+        match param.osc_type:
+            case OSCValueType.FLOAT:
+                param.value = 0.0
+            case OSCValueType.BOOL:
+                param.value = False
+            case OSCValueType.INT:
+                # reduce by one and wrap around
+                param.value = 255 if int(param.value) == 0 else int(param.value) - 1
+
+    def translate(self, row: int, from_lang: Optional[str] = None) -> None:
+        param = self.params[row]
+        self.translator(param.name, lambda translation: self._receive_translation(row, translation), from_lang)
+
+    def _receive_translation(self, row: int, translation: str) -> None:
+        if translation == src.my_translator.MyTranslator.TRANSLATION_ERROR_SAME_LANGUAGE:
+            translation = "already eng?"
+        self.params[row].translation = translation
+        self._set_feature(row, ParamFeature.TRANSLATED, bool(translation))
+        index = self.index(row, self.COLUMN_NAME)
+        self.dataChanged.emit(index, index, [Qt.ItemDataRole.DisplayRole])
+
+    def _set_feature(self, row: int, feature: ParamFeature, enabled: bool) -> None:
+        if enabled:
+            self.features[row] |= feature
+        else:
+            self.features[row] &= ~feature
+
+    def _mark_value_dirty(self, row: int) -> None:
+        self._dirty_rows.add(row)
+        if self.display_throttle is None:
+            self._emit_dirty_rows()
+        else:
+            self.display_throttle.post(self._emit_dirty_rows, None)
+
+    def _emit_dirty_rows(self, _=None) -> None:
+        if not self._dirty_rows:
+            return
+        first, last = min(self._dirty_rows), max(self._dirty_rows)
+        self._dirty_rows.clear()
+        self.dataChanged.emit(self.index(first, self.COLUMN_VALUE), self.index(last, self.COLUMN_VALUE),
+                              [Qt.ItemDataRole.DisplayRole])
+
+    @staticmethod
+    def _label_text(param: AvatarParam) -> str:
+        label_text = param.name
+        if param.translation:
+            label_text += " (" + param.translation + ")"
+        if not param.input_address:
+            label_text += " [RO]"
+        return label_text
+
+    @staticmethod
+    def _value_text(param: AvatarParam) -> str:
+        if param.osc_type == OSCValueType.FLOAT:
+            return "{:.7f}".format(param.value)
+        return str(param.value)
+
+    @staticmethod
+    def _parse_value(param: AvatarParam, text: str) -> bool | float | int:
+        match param.osc_type:
+            case OSCValueType.FLOAT:
+                try:
+                    return float(text)
+                except ValueError:
+                    return 0.0
+            case OSCValueType.BOOL:
+                return text.strip().lower() not in ("", "0", "false")
+            case _:
+                try:
+                    return int(text)
+                except ValueError:
+                    return 0
+
+
+class AvatarParamFilterProxyModel(QSortFilterProxyModel):
+    """
+    Sorts the parameters by name and hides all parameters that don't match the filter mask. Both only look at the
+    precomputed features and name ranks of AvatarParamTableModel.
+    """
+
+    def __init__(self, parent: QObject | None = None):
+        super().__init__(parent)
+        self._mask = 0
+        self._required = 0
+        # filtering and sorting only depend on the name and on toggling filters, not on value updates
+        self.setDynamicSortFilter(False)
+
+    def set_filter_mask(self, required: int, excluded: int) -> None:
+        """
+        Show only the parameters that have all required and none of the excluded ParamFeature bits.
+        """
+        self._mask = required | excluded
+        self._required = required
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row: int, source_parent: QModelIndex) -> bool:
+        return self.sourceModel().features[source_row] & self._mask == self._required
+
+    def lessThan(self, left: QModelIndex, right: QModelIndex) -> bool:
+        name_rank = self.sourceModel().name_rank
+        return name_rank[left.row()] < name_rank[right.row()]
+
+    def param_at(self, row: int) -> AvatarParam:
+        return self.data(self.index(row, 0), AvatarParamTableModel.PARAM_ROLE)
+
+
+class ButtonDelegate(QStyledItemDelegate):
+    """
+    Paints a push button with the display text of the cell and calls on_click with the source row when it is clicked.
+    No widget is created, so this costs nothing for rows that are scrolled out of view.
+    """
+
+    def __init__(self, on_click: Callable[[int], None], parent: QObject | None = None):
+        super().__init__(parent)
+        self.on_click = on_click
+
+    def paint(self, painter, option: QStyleOptionViewItem, index: QModelIndex) -> None:
+        button = QStyleOptionButton()
+        button.rect = option.rect.adjusted(1, 1, -1, -1)
+        button.text = index.data(Qt.ItemDataRole.DisplayRole) or ""
+        button.state = QStyle.StateFlag.State_Enabled | QStyle.StateFlag.State_Raised
+        style = option.widget.style() if option.widget is not None else QApplication.style()
+        style.drawControl(QStyle.ControlElement.CE_PushButton, button, painter, option.widget)
+
+    def editorEvent(self, event: QEvent, model, option: QStyleOptionViewItem, index: QModelIndex) -> bool:
+        if event.type() == QEvent.Type.MouseButtonRelease and option.rect.contains(event.position().toPoint()):
+            self.on_click(model.mapToSource(index).row() if isinstance(model, QSortFilterProxyModel) else index.row())
+            return True
+        return False
@@ -1,28 +1,29 @@
 from __future__ import annotations
 
-import re
 import typing
 
 from PyQt6.QtCore import Qt, QObject, pyqtSignal
-from PyQt6.QtGui import QPalette, QColor
-from PyQt6.QtWidgets import QWidget, QVBoxLayout, QScrollArea, QHBoxLayout
+from PyQt6.QtWidgets import QWidget, QHBoxLayout, QTableView, QHeaderView, QAbstractItemView
 
 from src import utils
 from src.my_translator import MyTranslator
-from src.vrc_osc.avatar import Avatar, AvatarParam
-from src.ui.avatar_param_widget import AvatarParamWidget
+from src.vrc_osc.avatar import Avatar
+from src.ui.avatar_param_model import AvatarParamTableModel, AvatarParamFilterProxyModel, ButtonDelegate, \
+    ParamFeature
+from src.ui.display_throttle import DisplayThrottle
 
 
 class _Filter(QObject):
     filter_toggled = pyqtSignal()
+    required_features: ParamFeature = ParamFeature(0)
+    """Parameters need all of these to pass the filter"""
+    excluded_features: ParamFeature = ParamFeature(0)
+    """Parameters must have none of these to pass the filter"""
 
     def __init__(self):
         super(QObject, self).__init__()
         self.active = False
 
-    def filter(self, avatar_params: set[AvatarParam]) -> set[AvatarParam]:
-        raise NotImplementedError()
-
     def get_text(self):
         return "Unnamed?"
 
@@ -31,36 +32,21 @@ class _Filter(QObject):
 
 
 class SelectionFilter(_Filter):
-    def filter(self, avatar_params: set[AvatarParam]) -> set[AvatarParam]:
-        filtered_params = set()
-        for param in avatar_params:
-            if param.selected:
-                filtered_params.add(param)
-        return filtered_params
+    required_features = ParamFeature.SELECTED
 
     def get_text(self):
         return "Selected"
 
 
 class GoGoLocoFilter(_Filter):
-    def filter(self, avatar_params: set[AvatarParam]) -> set[AvatarParam]:
-        filtered_params = set()
-        for param in avatar_params:
-            if not re.match(r"^(?:VF\d+_)?(?:Go/|OGB/|DexClone_|FaceEmo_|SB/)", param.name):
-                filtered_params.add(param)
-        return filtered_params
+    excluded_features = ParamFeature.SYSTEM_PREFIX
 
     def get_text(self):
         return "Exclude GoGoLoco"
 
 
 class InputOnlyFilter(_Filter):
-    def filter(self, avatar_params: set[AvatarParam]) -> set[AvatarParam]:
-        filtered_params = set()
-        for param in avatar_params:
-            if param.input_address:
-                filtered_params.add(param)
-        return filtered_params
+    required_features = ParamFeature.CONTROLLABLE
 
     def get_text(self):
         return "Must be controllable"
@@ -69,27 +55,37 @@ class InputOnlyFilter(_Filter):
         return True
 
 
+class UntranslatedFilter(_Filter):
+    excluded_features = ParamFeature.TRANSLATED
+
+    def get_text(self):
+        return "Not translated yet"
+
+
 class AvatarWidget(QWidget):
-    def __init__(self, my_translator: MyTranslator, avatar: Avatar, parent=None) -> None:
+    def __init__(self, my_translator: MyTranslator, avatar: Avatar, parent=None, display_rate_hz: float = 30.0) -> None:
         super().__init__(parent)
         self.avatar = avatar
-        self.tracked_osc_widgets: dict[str, AvatarParamWidget] = {}
+        self.display_throttle = DisplayThrottle(display_rate_hz, self)
         """
-        A list of all widgets that receive updates from vrchat. 
+        Shared by all rows, so values are repainted at most display_rate_hz times per second.
         """
         self.my_translator = my_translator
 
-        self.param_selection: list[AvatarParam] = []
+        self.param_model = AvatarParamTableModel(avatar, self.translate, self.display_throttle, self)
         """
-        contains the currently displayed osc-related parameters. basically a 
-          1. sorted 
-          2. filtered 
-        selection of .params
+        one row for every parameter of the avatar, in no particular order
         """
-        self.param_widgets: list[AvatarParamWidget] = []
+        self.param_selection = AvatarParamFilterProxyModel(self)
         """
-        list of widgets for every item in .param_selection
+        the currently displayed parameters. basically a
+          1. sorted
+          2. filtered
+        view of .param_model
         """
+        self.param_selection.setSourceModel(self.param_model)
+        self.param_selection.sort(AvatarParamTableModel.COLUMN_NAME)
+
         self.filters: set[_Filter] = set()
         """
         lis:t of subclasses of _Filter. These are toggleable filters
@@ -97,77 +93,77 @@ class AvatarWidget(QWidget):
         self.selection_filter = SelectionFilter()
         self.gogoloco_filter = GoGoLocoFilter()
         self.inputonly_filter = InputOnlyFilter()
+        self.untranslated_filter = UntranslatedFilter()
         self.filters.add(self.inputonly_filter)
         self.filters.add(self.selection_filter)
         self.filters.add(self.gogoloco_filter)
+        self.filters.add(self.untranslated_filter)
         for f in self.filters:
-            f.filter_toggled.connect(self.update_widgets)
-
-        # centerpiece
-        self.vbox = QVBoxLayout()
-        self.vbox.setSpacing(0)
-
-        # Add Scroll Bar
-        self.dummy_widget = QWidget()
-        self.dummy_widget.setLayout(self.vbox)
-
-        scrollview = QScrollArea(self)
-        scrollview.setWidget(self.dummy_widget)
-        scrollview.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOn)
-        scrollview.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOn)
-        scrollview.setWidgetResizable(True)
+            f.filter_toggled.connect(self.update_filters)
+
+        # centerpiece, only rows scrolled into view are painted
+        self.table_view = QTableView(self)
+        self.table_view.setModel(self.param_selection)
+        self.table_view.setAlternatingRowColors(True)
+        self.table_view.setSelectionMode(QAbstractItemView.SelectionMode.NoSelection)
+        self.table_view.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOn)
+        self.table_view.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOn)
+        self.table_view.setWordWrap(True)
+        self.table_view.verticalHeader().hide()
+        self.table_view.verticalHeader().setDefaultSectionSize(32)
+
+        self.translate_delegate = ButtonDelegate(self.param_model.translate, self)
+        self.set0_delegate = ButtonDelegate(self.param_model.decrement, self)
+        self.set1_delegate = ButtonDelegate(self.param_model.increment, self)
+        self.table_view.setItemDelegateForColumn(AvatarParamTableModel.COLUMN_TRANSLATE, self.translate_delegate)
+        self.table_view.setItemDelegateForColumn(AvatarParamTableModel.COLUMN_SET0, self.set0_delegate)
+        self.table_view.setItemDelegateForColumn(AvatarParamTableModel.COLUMN_SET1, self.set1_delegate)
+
+        header = self.table_view.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        header.setSectionResizeMode(AvatarParamTableModel.COLUMN_NAME, QHeaderView.ResizeMode.Stretch)
+        header.resizeSection(AvatarParamTableModel.COLUMN_TRANSLATE, 72)
+        header.resizeSection(AvatarParamTableModel.COLUMN_SELECTED, 24)
+        header.resizeSection(AvatarParamTableModel.COLUMN_TYPE, 20)
+        header.resizeSection(AvatarParamTableModel.COLUMN_VALUE, 80)
+        header.resizeSection(AvatarParamTableModel.COLUMN_SET0, 28)
+        header.resizeSection(AvatarParamTableModel.COLUMN_SET1, 28)
 
         hbox = QHBoxLayout()
-        hbox.addWidget(scrollview)
+        hbox.addWidget(self.table_view)
         self.setLayout(hbox)
 
-        self.odd_row_palette = QPalette()
-        self.odd_row_palette.setColor(QPalette.ColorRole.Window, QColor(0xFF, 0xFF, 0xFF))
-        self.even_row_palette = QPalette()
-        self.even_row_palette.setColor(QPalette.ColorRole.Window, QColor(0xDD, 0xDD, 0xDD))
+        self.update_filters()
+
+    def update_filters(self) -> None:
+        """
+        Re-apply the active filters to .param_selection. No widgets are created or destroyed.
+        """
+        required = excluded = 0
+        for f in self.filters:
+            if f.active:
+                required |= f.required_features
+                excluded |= f.excluded_features
+        self.param_selection.set_filter_mask(required, excluded)
+
+    def release(self) -> None:
+        """
+        Stop listening to parameter updates. Call this before dropping the widget.
+        """
+        self.param_model.release()
 
-        self.update_widgets()
+    def translate(self, text: str, callback: typing.Callable[[str], None], from_lang: typing.Optional[str] = None):
+        return self.my_translator.translate(text, callback, from_lang)
 
-    def update_widgets(self) -> None:
+    def translate_all_cjk(self):
         """
-        Recreate the ui based on self.param_selection
+        Translate every displayed parameter with Chinese, Japanese or Korean in its name, each from the language its
+        script points to. All names are classified in one pass, see utils.classify_scripts.
         """
-        selection = self.avatar.param_map.values()
-        for f in [f for f in self.filters if f.active]:
-            selection = f.filter(selection)
-        self.param_selection = sorted(selection, key=lambda ap: ap.name)
-
-        for widget in self.param_widgets:
-            self.vbox.removeWidget(widget)
-        self.param_widgets = []
-        self.tracked_osc_widgets = {}
-
-        every_other = False
-        for param in self.param_selection:
-            # create
-            new_param_widget = AvatarParamWidget(
-                param, self.translate
-            )
-
-            # stylize
-            new_param_widget.setAutoFillBackground(True)
-            if every_other:
-                new_param_widget.setPalette(self.odd_row_palette)
-            else:
-                new_param_widget.setPalette(self.even_row_palette)
-            every_other = not every_other
-
-            # store
-            self.param_widgets.append(new_param_widget)
-            self.vbox.addWidget(new_param_widget)
-            if param.output_address:
-                self.tracked_osc_widgets[param.output_address] = new_param_widget
-        return
-
-    def translate(self, text: str, callback: typing.Callable[[str], None]):
-        return self.my_translator.translate(text, callback)
-
-    def translate_all_chinese(self):
-        for widget in self.param_widgets:
-            if utils.contains_chinese(widget.ap.name):
-                widget.translate_name()
+        rows = [self.param_selection.mapToSource(self.param_selection.index(row, 0)).row()
+                for row in range(self.param_selection.rowCount())]
+        scripts = utils.classify_scripts(self.param_model.params[row].name for row in rows)
+        for row, name_scripts in zip(rows, scripts):
+            from_lang = utils.source_language(name_scripts)
+            if from_lang is not None:
+                self.param_model.translate(row, from_lang)
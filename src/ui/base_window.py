@@ -36,6 +36,8 @@ class BaseWindow(QMainWindow):
         translator_menu.addAction(self.my_translator.set_from_ko_action)
         translator_menu.addAction(self.my_translator.set_from_jp_action)
         translator_menu.addAction(self.my_translator.set_from_auto_action)
+        translator_menu.addSeparator()
+        translator_menu.addAction(self.my_translator.segment_mode_action)
 
     def pick_new_avatar_file_action(self):
         dialog = QFileDialog()
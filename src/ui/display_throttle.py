@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+from typing import Any, Callable
+
+from PyQt6.QtCore import QObject, QTimer
+
+
+class DisplayThrottle(QObject):
+    """
+    Coalesces value updates meant for display. Updates are collected per target and only the latest value of every
+    target is delivered, at most rate_hz times per second from a single timer. Parameters that VRChat updates a
+    hundred times per second are then repainted at the display rate, no matter the packet rate.
+    """
+
+    def __init__(self, rate_hz: float = 30.0, parent: QObject | None = None):
+        super().__init__(parent)
+        self._dirty: dict[Callable[[Any], None], Any] = {}
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self.flush)
+        self.set_rate(rate_hz)
+
+    def set_rate(self, rate_hz: float) -> None:
+        self._timer.setInterval(max(1, int(1000 / rate_hz)))
+
+    def post(self, target: Callable[[Any], None], value: Any) -> None:
+        """
+        Mark the target as dirty. It is called with the latest posted value on the next flush.
+        """
+        self._dirty[target] = value
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def discard(self, target: Callable[[Any], None]) -> None:
+        """
+        Forget a pending update, for example because the target is about to be deleted.
+        """
+        self._dirty.pop(target, None)
+
+    def flush(self) -> None:
+        if not self._dirty:
+            # nothing happened for a whole interval, sleep until the next post
+            self._timer.stop()
+            return
+        dirty, self._dirty = self._dirty, {}
+        for target, value in dirty.items():
+            target(value)
@@ -1,14 +1,15 @@
 from __future__ import annotations
 
+import os
 from typing import Optional
 
 from PyQt6.QtCore import QDir
 from PyQt6.QtGui import QPixmap
 from PyQt6.QtWidgets import QWidget, QVBoxLayout, QLabel, QHBoxLayout, QPushButton, QTabWidget
 
-from src.controller import Controller
+from src.avatar_cache import AvatarData
+from src.ui.avatar_osc_remote_window import AvatarOSCRemoteWindow
 from src.ui.base_window import BaseWindow
-from src.vrc_api import AvatarData
 
 import logging
 
@@ -73,6 +74,9 @@ class MainWindow(BaseWindow):
         self.inner_btn_layout.addWidget(self.launch_controller_btn)
 
         self.avatarData: Optional[AvatarData] = None
+        self.follow_window: Optional[AvatarOSCRemoteWindow] = None
+        """Remote tab that follows the avatar changes reported by VRChat, see switch_avatar"""
+        self._switching_to: str = ""
 
     def on_login(self, success: bool):
         self.refresh_action()
@@ -80,25 +84,74 @@ class MainWindow(BaseWindow):
     def tab_close_handler(self, index):
         if index == 0:
             return
+        # removing the tab doesn't close the window inside, which would keep it subscribed to OSC messages
+        widget = self.tabwidget.widget(index)
+        if widget is self.follow_window:
+            self.follow_window = None
+        widget.close()
         self.tabwidget.removeTab(index)
 
     def reload_finished(self, res: AvatarData):
         self.avi_lbl.setText("Avatar: " + res.name + " (" + str(res.id) + ")")
-        self.img_lbl.setPixmap(QPixmap.fromImage(res.img))
+        if res.img is None:
+            self.img_lbl.clear()
+        else:
+            self.img_lbl.setPixmap(QPixmap.fromImage(res.img))
         self.avatarData = res
+        self.update_controller_button(res.id)
 
 
     def refresh_action(self):
-        self.app.vrca.get_avatar_stuff(self.vrca.get_current_user(cached=False).current_avatar,
-                                       lambda res: self.reload_finished(res))
+        self.vrca.get_current_avatar_stuff(lambda res: self.reload_finished(res))
 
     def reload_finished_launch(self, res: AvatarData):
         self.reload_finished(res)
         self.launch_remote_action()
 
     def refresh_launch_action(self):
-        self.vrca.get_avatar_stuff(self.vrca.get_current_user(cached=False).current_avatar,
-                                       lambda res: self.reload_finished_launch(res))
+        self.vrca.get_current_avatar_stuff(lambda res: self.reload_finished_launch(res))
+
+    def switch_avatar(self, avatar_id: str, filename: str):
+        """
+        Show the avatar VRChat switched to and open its controller, or show it in the remote tab that follows avatar
+        changes. Name and thumbnail come from the avatar cache, the API is only asked for avatars that aren't cached.
+        :param filename: the OSC config of the avatar
+        """
+        self._switching_to = avatar_id
+        res = self.vrca.avatar_cache.get(avatar_id)
+        if res is None and self.vrca.api_client is not None:
+            self.vrca.get_avatar_stuff(avatar_id, lambda r: self._show_switched_avatar(r, filename))
+            return
+        if res is None:
+            res = AvatarData()
+            res.id = avatar_id
+            res.name = avatar_id
+        self._show_switched_avatar(res, filename)
+
+    def _show_switched_avatar(self, res: AvatarData, filename: str):
+        if res.id != self._switching_to:
+            # switched again while the metadata was loading
+            return
+        # <OSC directory>/<user id>/Avatars/<avatar id>.json
+        res.user = os.path.basename(os.path.dirname(os.path.dirname(filename)))
+        self.reload_finished(res)
+
+        controller = self.app.controller_registry.controllers.get(res.id)
+        if controller is not None:
+            for window in self.app.avatar_controller:
+                if window.avatar.avatar_id == res.id:
+                    window.raise_()
+                    return
+            self.app.spawn_controller_window(filename, controller)
+        elif self.follow_window is not None:
+            self.app.switch_avatar_window(self.follow_window, filename)
+            self.tabwidget.setTabText(self.tabwidget.indexOf(self.follow_window), res.name)
+        else:
+            self.app.spawn_avatar_window(filename, lambda window: self._add_follow_tab(window, res.name))
+
+    def _add_follow_tab(self, avatar_window: AvatarOSCRemoteWindow, avatar_name: str):
+        self.follow_window = avatar_window
+        self.add_avatar_window_tab(avatar_window, avatar_name)
 
     def launch_remote_action(self):
         log.debug("Launching remote")
@@ -126,7 +179,7 @@ class MainWindow(BaseWindow):
         return QDir(entire_path).absolutePath()
 
     def update_controller_button(self, avatar_id: str) -> None:
-        c = Controller.registry.get(avatar_id, None)
+        c = self.app.controller_registry.controllers.get(avatar_id, None)
         if c is None:
             self.launch_controller_btn.setEnabled(False)
         else:
@@ -135,7 +188,7 @@ class MainWindow(BaseWindow):
     def launch_controller(self):
         if self.avatarData is None:
             return
-        controller = Controller.registry.get(self.avatarData.id, None)
+        controller = self.app.controller_registry.controllers.get(self.avatarData.id, None)
         if controller is None:
             return
         json_path = self._get_avatar_osc_file()
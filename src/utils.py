@@ -1,7 +1,97 @@
+import bisect
+import enum
 import re
+from typing import Iterable, Optional
 
+_HAN_CHARS = (
+    "\u3400-\u4dbf"  # CJK unified ideographs extension A
+    "\u4e00-\u9fff"  # CJK unified ideographs
+)
+_KANA_CHARS = (
+    "\u3040-\u30ff"  # hiragana, katakana
+    "\uff66-\uff9f"  # halfwidth katakana
+)
+_HANGUL_CHARS = (
+    "\u1100-\u11ff"  # hangul jamo
+    "\u3130-\u318f"  # hangul compatibility jamo
+    "\uac00-\ud7af"  # hangul syllables
+)
+_CJK_CHARS = _HAN_CHARS + _KANA_CHARS + _HANGUL_CHARS
+_SEGMENT_PATTERN = re.compile(f"[/_]|[{_CJK_CHARS}]+|[^/_{_CJK_CHARS}]+")
+_CJK_PATTERN = re.compile(f"[{_CJK_CHARS}]")
+_SCRIPT_PATTERN = re.compile(
+    f"(?P<HAN>[{_HAN_CHARS}]+)|(?P<KANA>[{_KANA_CHARS}]+)|(?P<HANGUL>[{_HANGUL_CHARS}]+)|(?P<LATIN>[A-Za-z]+)"
+)
 
-def contains_chinese(text):
-    if text:
-        return re.search(u"[\u4e00-\u9fff]", text)
-    return False
+
+class Script(enum.IntFlag):
+    HAN = enum.auto()
+    """Chinese characters, also used in Japanese"""
+    KANA = enum.auto()
+    HANGUL = enum.auto()
+    LATIN = enum.auto()
+
+
+def contains_cjk(text: str) -> bool:
+    return bool(text) and _CJK_PATTERN.search(text) is not None
+
+
+def split_name_segments(text: str) -> list[str]:
+    """
+    Split an avatar parameter name into the segments it is usually built from. "/" and "_" are segments of their own
+    and runs of CJK characters are split from everything else, so "VF35_衣服/上衣A" becomes
+    ["VF35", "_", "衣服", "/", "上衣", "A"]. Joining the segments gives back the original name.
+    """
+    return _SEGMENT_PATTERN.findall(text)
+
+
+def join_name_segments(segments: list[str], translated: dict[str, str]) -> str:
+    """
+    Put a name split by split_name_segments back together, replacing every segment found in translated.
+    """
+    parts = []
+    for i, segment in enumerate(segments):
+        translation = translated.get(segment)
+        if translation is None:
+            parts.append(segment)
+            continue
+        # keep translated words apart from words they were glued to, like "开关A"
+        if i > 0 and segments[i - 1] not in "/_" and not segments[i - 1][-1].isspace():
+            parts.append(" ")
+        parts.append(translation)
+        if i + 1 < len(segments) and segments[i + 1] not in "/_" and not segments[i + 1][0].isspace():
+            parts.append(" ")
+    return "".join(parts)
+
+
+def classify_scripts(names: Iterable[str]) -> list[Script]:
+    """
+    Detect the scripts used by every name with a single regex pass over all of them.
+    :return: the scripts of every name, in the order of names
+    """
+    names = list(names)
+    starts = []
+    offset = 0
+    for name in names:
+        starts.append(offset)
+        offset += len(name) + 1
+    scripts = [Script(0)] * len(names)
+    for match in _SCRIPT_PATTERN.finditer("\n".join(names)):
+        i = bisect.bisect_right(starts, match.start()) - 1
+        scripts[i] |= Script[match.lastgroup]
+    return scripts
+
+
+def source_language(scripts: Script) -> Optional[str]:
+    """
+    Guess the language to translate from based on the scripts of a name.
+    Kana only appears in Japanese and Hangul only in Korean, Chinese characters alone are taken as Chinese.
+    :return: the language code or None if there is nothing to translate
+    """
+    if scripts & Script.KANA:
+        return "ja"
+    if scripts & Script.HANGUL:
+        return "ko"
+    if scripts & Script.HAN:
+        return "zh"
+    return None
@@ -1,10 +1,12 @@
 from __future__ import annotations
 
+import logging
 from http.cookiejar import LWPCookieJar
-from typing import Optional, Callable
+from typing import Optional, Callable, Any
 
 import vrchatapi
-from PyQt6.QtCore import QObject, pyqtSignal, QUrl, pyqtBoundSignal
+from PyQt6.QtCore import QObject, pyqtSignal, QUrl, pyqtBoundSignal, QRunnable, pyqtSlot, QThreadPool, \
+    QElapsedTimer, QTimer
 from PyQt6.QtGui import QImage
 from PyQt6.QtNetwork import QNetworkAccessManager, QNetworkReply, QNetworkRequest
 from PyQt6.QtWidgets import QInputDialog, QMessageBox
@@ -12,26 +14,157 @@ from vrchatapi import TwoFactorEmailCode, TwoFactorAuthCode
 from vrchatapi.api import authentication_api
 from vrchatapi.exceptions import UnauthorizedException
 
+from src.avatar_cache import AvatarData, AvatarCache
 
-class AvatarData:
-    def __init__(self):
-        self.id: str = ""
-        self.name: str = ""
-        self.user: str = ""
-        self.img: Optional[QImage] = None
+log = logging.getLogger(__name__)
+
+
+class _ApiTaskSignals(QObject):
+    done = pyqtSignal(object)
+    failed = pyqtSignal(object)
+
+
+class _ApiTask(QRunnable):
+    """
+    Runs a blocking vrchatapi call on a worker thread.
+    The done signal is emitted with the result of the call, the failed signal with the exception it raised.
+    """
+    def __init__(self, call: Callable[[], Any]):
+        super().__init__()
+        self.call = call
+        self.signals = _ApiTaskSignals()
+
+    @pyqtSlot()
+    def run(self):
+        try:
+            result = self.call()
+        except Exception as e:
+            self.signals.failed.emit(e)
+            return
+        self.signals.done.emit(result)
 
 
 class VRCApiService(QObject):
+    """
+    Talks to the VRChat REST API. Every request runs on a worker thread and reports back through signals or callbacks
+    on the GUI thread, so the UI and OSC handling never wait for the network. Only the login dialogs run on the GUI
+    thread.
+
+    All requests share one long-lived ApiClient, which keeps its HTTP connections open between requests. Its cookies
+    are written to auth.txt only when they changed.
+    """
     # signals
     logged_in: pyqtBoundSignal = pyqtSignal(bool)
+    MAX_CONCURRENT_REQUESTS = 2
+    CURRENT_USER_MIN_INTERVAL_MS = 2000
+    """Current user requests are at least this far apart, requests in between are answered together"""
+    SHUTDOWN_TIMEOUT_MS = 2000
+    """How long close waits for running requests, the API client has no request timeout"""
+    COOKIE_FILE = "auth.txt"
 
     def __init__(self, network_manager):
         super(QObject, self).__init__()
         self.api_client: Optional[vrchatapi.ApiClient] = None
+        """The client of the logged-in session, None before the login succeeded"""
         self.current_user: Optional[dict] = None
         self.user_agent: str = "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:125.0) Gecko/20100101 Firefox/125.0"
         self.client_config: vrchatapi.Configuration = vrchatapi.Configuration()
+        # one pooled connection per worker thread is enough
+        self.client_config.connection_pool_maxsize = self.MAX_CONCURRENT_REQUESTS
         self.network_manager: QNetworkAccessManager = network_manager
+        self.threadpool = QThreadPool()
+        self.threadpool.setMaxThreadCount(self.MAX_CONCURRENT_REQUESTS)
+        self.avatar_cache = AvatarCache("avatars.sqlite3")
+
+        self._client: Optional[vrchatapi.ApiClient] = None
+        self._auth_api: Optional[authentication_api.AuthenticationApi] = None
+        self._avatars_api: Optional[vrchatapi.AvatarsApi] = None
+        self._cookie_jar: Optional[LWPCookieJar] = None
+        self._saved_cookies: tuple = ()
+        """Snapshot of the cookies in auth.txt, see _flush_cookies"""
+
+        self._current_user_callbacks: list[Callable[[Any], None]] = []
+        self._current_user_in_flight = False
+        self._current_user_fetched_at = QElapsedTimer()
+        self._current_user_timer = QTimer()
+        self._current_user_timer.setSingleShot(True)
+        self._current_user_timer.timeout.connect(self._request_current_user)
+
+    def run_async(self, call: Callable[[], Any],
+                  on_done: Callable[[Any], None],
+                  on_failed: Optional[Callable[[Exception], None]] = None) -> None:
+        """
+        Run a blocking call on a worker thread.
+        :param on_done: called on the GUI thread with the result of call
+        :param on_failed: called on the GUI thread with the exception raised by call. If not given, the exception is
+            logged.
+        """
+        task = _ApiTask(call)
+        task.signals.done.connect(on_done)
+        if on_failed is None:
+            task.signals.failed.connect(lambda e: log.error(f"VRChat API request failed: {e}"))
+        else:
+            task.signals.failed.connect(on_failed)
+        self.threadpool.start(task)
+
+    def close(self) -> None:
+        """
+        Drop all requests that didn't start yet and wait up to SHUTDOWN_TIMEOUT_MS for the running ones, so a stalled
+        request doesn't keep the application from exiting.
+        """
+        self._current_user_timer.stop()
+        self.threadpool.clear()
+        finished = self.threadpool.waitForDone(self.SHUTDOWN_TIMEOUT_MS)
+        self.avatar_cache.close()
+        if self._client is not None:
+            self._flush_cookies()
+            if finished:
+                self._client.close()
+            else:
+                # the workers still use the client, it goes away with the process
+                log.warning(f"{self.threadpool.activeThreadCount()} VRChat API requests didn't finish before exit")
+
+    def _session(self) -> tuple[vrchatapi.ApiClient, authentication_api.AuthenticationApi]:
+        """
+        Create the shared client on first use, with the cookies of the last session.
+        """
+        if self._client is None:
+            self._client = vrchatapi.ApiClient(self.client_config)
+            self._client.user_agent = self.user_agent
+            self._auth_api = authentication_api.AuthenticationApi(self._client)
+            self._avatars_api = vrchatapi.AvatarsApi(self._client)
+
+            self._cookie_jar = LWPCookieJar(self.COOKIE_FILE)
+            try:
+                self._cookie_jar.load()
+                for cookie in self._cookie_jar:
+                    self._client.rest_client.cookie_jar.set_cookie(cookie)
+            except FileNotFoundError:
+                self._cookie_jar.save()
+            self._saved_cookies = self._cookie_snapshot()
+        return self._client, self._auth_api
+
+    def _cookie_snapshot(self) -> tuple:
+        return tuple(sorted(
+            (cookie.domain, cookie.path, cookie.name, cookie.value, cookie.expires)
+            for cookie in self._client.rest_client.cookie_jar
+            if cookie.name != "twoFactorAuth"
+        ))
+
+    def _flush_cookies(self) -> None:
+        """
+        Write the cookies of the client to auth.txt if they changed since the last time.
+        """
+        snapshot = self._cookie_snapshot()
+        if snapshot == self._saved_cookies:
+            return
+        self._cookie_jar.clear()
+        for cookie in self._client.rest_client.cookie_jar:
+            if cookie.name == "twoFactorAuth":
+                continue
+            self._cookie_jar.set_cookie(cookie)
+        self._cookie_jar.save()
+        self._saved_cookies = snapshot
 
     def interactive_login_user(self):
         """
@@ -39,206 +172,218 @@ class VRCApiService(QObject):
         Silences all exceptions deemed to only have been caused by wrong
         Username/Password/2FA Code input,
         the rest are passed through.
+        Returns right after asking for the credentials, the requests run on a worker thread.
         :return:
         """
         self.client_config.username = QInputDialog().getText(None, "VRChat E-Mail", "Enter")[0]
         self.client_config.password = QInputDialog().getText(None, "VRChat Password", "Enter")[0]
 
-        new_api_client = vrchatapi.ApiClient(self.client_config)
-        new_api_client.user_agent = self.user_agent
-
-        cookie_jar = LWPCookieJar("auth.txt")
-        try:
-            cookie_jar.load()
-            for cookie in cookie_jar:
-                new_api_client.rest_client.cookie_jar.set_cookie(cookie)
-        except FileNotFoundError:
-            cookie_jar.save()
-
-        auth_api = authentication_api.AuthenticationApi(new_api_client)
-        current_user = None
-
-        try:
-            current_user = auth_api.get_current_user()
-        except UnauthorizedException as e:
-            # check if 2FA is requested
-            if e.status == 200:
-                # if the follow call also throws, the 2FA code was wrong. Refactor later?
-                try:
-                    if "Email 2 Factor Authentication" in e.reason:
-                        auth_api.verify2_fa_email_code(two_factor_email_code=TwoFactorEmailCode(
-                            QInputDialog().getText(None, "2FA Code", "Enter")[0]
-                        ))
-                    elif "2 Factor Authentication" in e.reason:
-                        auth_api.verify2_fa(two_factor_auth_code=TwoFactorAuthCode(
-                            QInputDialog().getText(None, "2FA Code", "Enter")[0]
-                        ))
-                except vrchatapi.exceptions.ApiException as _:
-                    self.logged_in.emit(False)
-                    return
-                current_user = auth_api.get_current_user()
-            else:
-                # failure wasn't related to 2FA?
+        _, auth_api = self._session()
 
-                QMessageBox.warning(None, "Error while logging in:", "{}".format(str(e)))
-                return
-        except vrchatapi.ApiException as e:
-            # failure wasn't related to logging in?
-            QMessageBox.warning(None, "Error while logging in:", "{}".format(str(e)))
-            self.logged_in.emit(False)
-            return
-        self.current_user = current_user
-        self.api_client = new_api_client
-
-        for cookie in new_api_client.rest_client.cookie_jar:
-            if cookie.name == "twoFactorAuth":
-                continue
-            cookie_jar.set_cookie(cookie)
-        cookie_jar.save()
-
-        self.logged_in.emit(True)
-
-        def interactive_login_user(self):
-            """
-            Tries to log in the user. On success emits self.logged_in.
-            Silences all exceptions deemed to only have been caused by wrong
-            Username/Password/2FA Code input,
-            the rest are passed through.
-            :return:
-            """
-            self.client_config.username = QInputDialog().getText(None, "VRChat E-Mail", "Enter")[0]
-            self.client_config.password = QInputDialog().getText(None, "VRChat Password", "Enter")[0]
-
-            new_api_client = vrchatapi.ApiClient(self.client_config)
-            new_api_client.user_agent = self.user_agent
-
-            cookie_jar = LWPCookieJar("auth.txt")
-            try:
-                cookie_jar.load()
-                for cookie in cookie_jar:
-                    new_api_client.rest_client.cookie_jar.set_cookie(cookie)
-            except FileNotFoundError:
-                cookie_jar.save()
-
-            auth_api = authentication_api.AuthenticationApi(new_api_client)
-            current_user = None
-
-            try:
-                current_user = auth_api.get_current_user()
-            except UnauthorizedException as e:
+        def failed(e: Exception):
+            if isinstance(e, UnauthorizedException):
                 # check if 2FA is requested
                 if e.status == 200:
-                    # if the follow call also throws, the 2FA code was wrong. Refactor later?
-                    try:
-                        if "Email 2 Factor Authentication" in e.reason:
-                            auth_api.verify2_fa_email_code(two_factor_email_code=TwoFactorEmailCode(
-                                QInputDialog().getText(None, "2FA Code", "Enter")[0]
-                            ))
-                        elif "2 Factor Authentication" in e.reason:
-                            auth_api.verify2_fa(two_factor_auth_code=TwoFactorAuthCode(
-                                QInputDialog().getText(None, "2FA Code", "Enter")[0]
-                            ))
-                    except vrchatapi.exceptions.ApiException as _:
-                        self.logged_in.emit(False)
-                        return
-                    current_user = auth_api.get_current_user()
+                    self._verify_2fa(e.reason)
                 else:
                     # failure wasn't related to 2FA?
-
                     QMessageBox.warning(None, "Error while logging in:", "{}".format(str(e)))
-                    return
-            except vrchatapi.ApiException as e:
+            elif isinstance(e, vrchatapi.ApiException):
                 # failure wasn't related to logging in?
                 QMessageBox.warning(None, "Error while logging in:", "{}".format(str(e)))
                 self.logged_in.emit(False)
-                return
-            self.current_user = current_user
-            self.api_client = new_api_client
+            else:
+                log.error(f"Logging in failed: {e}")
+                self.logged_in.emit(False)
 
-            for cookie in new_api_client.rest_client.cookie_jar:
-                if cookie.name == "twoFactorAuth":
-                    continue
-                cookie_jar.set_cookie(cookie)
-            cookie_jar.save()
+        self.run_async(auth_api.get_current_user, self._finish_login, failed)
 
-            self.logged_in.emit(True)
+    def _verify_2fa(self, reason: str):
+        _, auth_api = self._session()
+        if "Email 2 Factor Authentication" in reason:
+            code = TwoFactorEmailCode(QInputDialog().getText(None, "2FA Code", "Enter")[0])
+            verify = lambda: auth_api.verify2_fa_email_code(two_factor_email_code=code)
+        elif "2 Factor Authentication" in reason:
+            code = TwoFactorAuthCode(QInputDialog().getText(None, "2FA Code", "Enter")[0])
+            verify = lambda: auth_api.verify2_fa(two_factor_auth_code=code)
+        else:
+            verify = lambda: None
 
-    def fast_login(self):
-        new_api_client = vrchatapi.ApiClient(self.client_config)
-        new_api_client.user_agent = self.user_agent
+        def verify_and_get_user():
+            # if this throws, the 2FA code was wrong
+            try:
+                verify()
+            except vrchatapi.exceptions.ApiException:
+                return None
+            return auth_api.get_current_user()
 
-        cookie_jar = LWPCookieJar("auth.txt")
-        try:
-            cookie_jar.load()
-            for cookie in cookie_jar:
-                new_api_client.rest_client.cookie_jar.set_cookie(cookie)
-        except FileNotFoundError:
-            cookie_jar.save()
+        def done(current_user):
+            if current_user is None:
+                self.logged_in.emit(False)
+            else:
+                self._finish_login(current_user)
 
-        auth_api = authentication_api.AuthenticationApi(new_api_client)
-        current_user = None
+        self.run_async(verify_and_get_user, done)
 
-        try:
-            current_user = auth_api.get_current_user()
-        except UnauthorizedException as e:
-            self.interactive_login_user()
-            return
-        except Exception as e:
+    def fast_login(self):
+        """
+        Log in with the cookies of the last session and fall back to interactive_login_user if they are no longer
+        valid. Returns immediately, self.logged_in is emitted once done.
+        """
+        _, auth_api = self._session()
+
+        def failed(e: Exception):
+            if isinstance(e, UnauthorizedException):
+                self.interactive_login_user()
+                return
             # failure wasn't related to logging in?
             QMessageBox.warning(None, "Error while logging in:", "{}".format(str(e)))
             self.logged_in.emit(False)
-            return
+
+        self.run_async(auth_api.get_current_user, self._finish_login, failed)
+
+    def _finish_login(self, current_user):
         self.current_user = current_user
-        self.api_client = new_api_client
-        for cookie in new_api_client.rest_client.cookie_jar:
-            if cookie.name == "twoFactorAuth":
-                continue
-            cookie_jar.set_cookie(cookie)
-        cookie_jar.save()
+        self.api_client = self._client
+        self._current_user_fetched_at.start()
+        self._flush_cookies()
 
         self.logged_in.emit(True)
 
     def get_current_user(self, cached=True):
+        """
+        :param cached: if False, fetch the user from the API first. That blocks until the request is done, use
+            fetch_current_user instead on the GUI thread.
+        """
         if not cached:
-            auth_client = vrchatapi.AuthenticationApi(self.api_client)
-            self.current_user = auth_client.get_current_user()
+            self.current_user = self._session()[1].get_current_user()
         return self.current_user
 
+    def fetch_current_user(self, callback: Callable[[Any], None]) -> None:
+        """
+        Fetch the current user on a worker thread and call callback with it, see get_current_user.
+        Calls while a request is pending are answered by that request. A new request is sent at most every
+        CURRENT_USER_MIN_INTERVAL_MS, until then the callbacks wait.
+        """
+        self._current_user_callbacks.append(callback)
+        if self._current_user_in_flight or self._current_user_timer.isActive():
+            return
+        elapsed = self._current_user_fetched_at.elapsed() if self._current_user_fetched_at.isValid() else None
+        if elapsed is None or elapsed >= self.CURRENT_USER_MIN_INTERVAL_MS:
+            self._request_current_user()
+        else:
+            self._current_user_timer.start(self.CURRENT_USER_MIN_INTERVAL_MS - elapsed)
+
+    def _request_current_user(self) -> None:
+        self._current_user_in_flight = True
+        _, auth_api = self._session()
+
+        def done(current_user):
+            self.current_user = current_user
+            self._flush_cookies()
+            for callback in self._finish_current_user_request():
+                callback(current_user)
+
+        def failed(e: Exception):
+            log.error(f"Fetching the current user failed: {e}")
+            self._finish_current_user_request()
+
+        self.run_async(auth_api.get_current_user, done, failed)
+
+    def _finish_current_user_request(self) -> list[Callable[[Any], None]]:
+        self._current_user_in_flight = False
+        self._current_user_fetched_at.start()
+        callbacks, self._current_user_callbacks = self._current_user_callbacks, []
+        return callbacks
+
+    def get_current_avatar_stuff(self, callback: Callable[[AvatarData], None]) -> None:
+        """
+        Fetch the current user and then the avatar they are wearing, see get_avatar_stuff.
+        """
+        self.fetch_current_user(lambda current_user: self.get_avatar_stuff(current_user.current_avatar, callback))
+
     def get_avatar_stuff(self, avatar_id, callback: Callable[[AvatarData], None]) -> None:
         """
         requires a successful call of self.interactive_login_user() before this
-        works. Otherwise, this will throw a bunch of exceptions related to not
-        being authenticated.
+        works. Otherwise, the request fails with errors related to not
+        being authenticated, which are logged.
         callback is called after all network communication (avatar json, icon)
         is finished. If the image fetching didn't work, AvatarData.img might
         be None
+        Avatars fetched within the last AvatarCache.max_age are answered right away from the cache. Older ones are
+        fetched again, but their thumbnail is only downloaded if it changed.
         """
+        cached = self.avatar_cache.get(avatar_id)
+        if cached is not None:
+            cached.user = self.current_user.id
+            if self.avatar_cache.is_fresh(cached):
+                callback(cached)
+                return
+
+        def failed(e: Exception):
+            if cached is None:
+                log.error(f"Fetching avatar {avatar_id} failed: {e}")
+                return
+            log.warning(f"Fetching avatar {avatar_id} failed, using the cached one: {e}")
+            callback(cached)
+
+        self._session()
+        avatar_api = self._avatars_api
+        self.run_async(lambda: avatar_api.get_avatar(avatar_id),
+                       lambda avatar_data: self._get_avatar_image(avatar_id, avatar_data, cached, callback),
+                       failed)
+
+    def _get_avatar_image(self, avatar_id, avatar_data, cached: Optional[AvatarData],
+                          callback: Callable[[AvatarData], None]) -> None:
         result: AvatarData = AvatarData()
-        avatar_api = vrchatapi.AvatarsApi(self.api_client)
-        avatar_data = avatar_api.get_avatar(avatar_id)
         result.user = self.current_user.id
         result.name = avatar_data.name
         result.id = avatar_id
         # full image is .image_url
-        img_url = QUrl(avatar_data.thumbnail_image_url)
-
-        request = self.network_manager.get(QNetworkRequest(img_url))
+        result.thumbnail_url = avatar_data.thumbnail_image_url
+        img_url = QUrl(result.thumbnail_url)
+
+        network_request = QNetworkRequest(img_url)
+        if cached is not None and cached.thumbnail is not None and cached.thumbnail_url == result.thumbnail_url:
+            # revalidate, the server answers 304 without a body if the thumbnail didn't change
+            if cached.etag:
+                network_request.setRawHeader(b"If-None-Match", cached.etag.encode())
+            if cached.last_modified:
+                network_request.setRawHeader(b"If-Modified-Since", cached.last_modified.encode())
+        else:
+            cached = None
+        request = self.network_manager.get(network_request)
         request.finished.connect(
             lambda
                 req=request,
                 s=self,
                 res=result,
+                c=cached,
                 cb=callback:
-            s.finish_get_avatar_stuff(req, res, cb)
+            s.finish_get_avatar_stuff(req, res, c, cb)
         )
         return
 
-    # noinspection PyMethodMayBeStatic
-    def finish_get_avatar_stuff(self, request: QNetworkReply, res: AvatarData, callback):
-        if request.error() == QNetworkReply.NetworkError.NoError:
-            data = request.readAll()
-            image = QImage.fromData(data)
-            res.img = image
+    def finish_get_avatar_stuff(self, request: QNetworkReply, res: AvatarData, cached: Optional[AvatarData], callback):
+        """
+        :param cached: the cached avatar if the request revalidates its thumbnail
+        """
+        status = request.attribute(QNetworkRequest.Attribute.HttpStatusCodeAttribute)
+        if request.error() != QNetworkReply.NetworkError.NoError:
+            # keep showing the cached thumbnail, but don't mark it as fresh
+            res.img = cached.img if cached is not None else None
+        elif cached is not None and status == 304:
+            # unchanged, keep the cached thumbnail and its decoded image
+            res.thumbnail = cached.thumbnail
+            res.img = cached.img
+            res.etag = cached.etag
+            res.last_modified = cached.last_modified
+            self.avatar_cache.store(res)
         else:
-            res.img = None
+            res.thumbnail = request.readAll().data()
+            res.img = QImage.fromData(res.thumbnail)
+            res.etag = request.rawHeader(b"ETag").data().decode(errors="replace")
+            res.last_modified = request.rawHeader(b"Last-Modified").data().decode(errors="replace")
+            self.avatar_cache.store(res)
+        request.deleteLater()
         callback(res)
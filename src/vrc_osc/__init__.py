@@ -0,0 +1,3 @@
+from src.vrc_osc.vrc_osc import OSCValueType, OscMessage, OscMessageTemplate, OscBundleScheduler, OscSendBatcher, \
+    ThreadedOscReceiver, VrcOscService, OSC_IMMEDIATELY, AVATAR_CHANGE_ADDRESS, decode_osc_message, encode_osc_message, \
+    encode_osc_bundles, iter_osc_packet, osc_timetag_to_time
@@ -1,157 +1,612 @@
 from __future__ import annotations
 
+import hashlib
 import json
-from typing import Any, Callable
+import logging
+import os
+import pickle
+import sys
+import tempfile
+from array import array
+from collections.abc import Mapping
+from typing import Any, Callable, Optional, Iterator, Iterable
 
-from src.vrc_osc.vrc_osc import OSCValueType, OscMessage, VrcOscService
+from src.vrc_osc.vrc_osc import OSCValueType, OscMessage, VrcOscService, OscMessageTemplate
+
+log = logging.getLogger(__name__)
+
+
+def coerce_float(value: Any) -> float:
+    """VRChat only accepts floats in [-1, 1]. NaN becomes 0."""
+    value = float(value)
+    if value != value:
+        return 0.0
+    return -1.0 if value < -1.0 else 1.0 if value > 1.0 else value
+
+
+def coerce_int(value: Any) -> int:
+    """VRChat only accepts ints in [0, 255]"""
+    value = int(value)
+    return 0 if value < 0 else 255 if value > 255 else value
+
+
+def coerce_bool(value: Any) -> bool:
+    return bool(value)
+
+
+COERCERS: dict[str, Callable[[Any], bool | float | int]] = {
+    OSCValueType.FLOAT: coerce_float,
+    OSCValueType.INT: coerce_int,
+    OSCValueType.BOOL: coerce_bool,
+}
+"""Convert any value into a value of the parameter type that VRChat accepts, by OSCValueType. Used for sent values.
+Raise ValueError, TypeError or OverflowError if they can't."""
+
+CONVERTERS: dict[str, Callable[[Any], bool | float | int]] = {
+    OSCValueType.FLOAT: float,
+    OSCValueType.INT: int,
+    OSCValueType.BOOL: bool,
+}
+"""Convert received values into the parameter type without clamping them, VRChat reports e.g. VelocityX in m/s"""
+
+_COERCE_ERRORS = (TypeError, ValueError, ArithmeticError)
+
+DEFAULT_TYPE_DEADBANDS: dict[str, float] = {
+    OSCValueType.FLOAT: 0.005,
+}
+"""
+Deadbands new avatars start with, by OSCValueType. Below the 1/127 steps VRChat syncs floats in, but enough to drop
+the jitter of e.g. VelocityX while standing still.
+"""
+
+DETACHED = -1
+"""Slot of AvatarParam views whose parameter was removed by Avatar.update_schema"""
+
+_READERS: dict[str, Callable[[float], bool | float | int]] = {
+    OSCValueType.INT: int,
+    OSCValueType.BOOL: bool,
+}
+"""Convert the doubles in Avatar.values back to the parameter type, floats are kept as they are"""
+
+
+class AvatarSchema:
+    """
+    Everything the VRChat OSC config file of an avatar says about it. Every parameter has a slot, an index into the
+    tuples of names, addresses and types. Names and addresses are interned, so they are shared with the addresses
+    decoded from OSC messages.
+
+    Schemas are shared by all Avatar instances loaded from the same file, see AvatarSchemaCache. Don't modify them.
+    """
+    def __init__(self, avatar_id: str, avatar_name: str, params: Iterable[tuple[str, str, str, str, str, str]]):
+        """
+        :param params: (name, input address, output address, type, input type, output type) of every parameter
+        """
+        self.avatar_id = avatar_id
+        self.avatar_name = avatar_name
+        params = tuple(params)
+        self.names: tuple[str, ...] = tuple(sys.intern(p[0]) for p in params)
+        self.input_addresses: tuple[str, ...] = tuple(sys.intern(p[1]) for p in params)
+        self.output_addresses: tuple[str, ...] = tuple(sys.intern(p[2]) for p in params)
+        self.types: tuple[str, ...] = tuple(sys.intern(p[3]) for p in params)
+        self.input_types: tuple[str, ...] = tuple(sys.intern(p[4]) for p in params)
+        self.output_types: tuple[str, ...] = tuple(sys.intern(p[5]) for p in params)
+        self.templates: tuple[Optional[OscMessageTemplate], ...] = tuple(
+            OscMessageTemplate(address, osc_type) if address else None
+            for address, osc_type in zip(self.output_addresses, self.types)
+        )
+        self.coercers: tuple[Optional[Callable[[Any], bool | float | int]], ...] = tuple(
+            COERCERS.get(osc_type) for osc_type in self.types
+        )
+        """Coercer of every slot, None for types that can't hold values"""
+        self.converters: tuple[Optional[Callable[[Any], bool | float | int]], ...] = tuple(
+            CONVERTERS.get(osc_type) for osc_type in self.types
+        )
+        """Converter of every slot for received values, None for types that can't hold values"""
+        self.readers: tuple[Optional[Callable[[float], bool | int]], ...] = tuple(
+            _READERS.get(osc_type) for osc_type in self.types
+        )
+        self.slot_by_name: dict[str, int] = {name: slot for slot, name in enumerate(self.names) if name}
+        self.slot_by_address: dict[str, int] = {
+            address: slot for slot, address in enumerate(self.output_addresses) if address
+        }
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __reduce__(self):
+        # templates and lookups are rebuilt, so only the plain strings are pickled
+        params = zip(self.names, self.input_addresses, self.output_addresses, self.types, self.input_types,
+                     self.output_types)
+        return AvatarSchema, (self.avatar_id, self.avatar_name, list(params))
+
+    @staticmethod
+    def from_json(j: dict) -> AvatarSchema:
+        """
+        :param j: the content of a VRChat OSC config file
+        """
+        return AvatarSchema(j.get('id') or "", j.get('name') or "",
+                            [AvatarSchema._parse_param(j_param) for j_param in j["parameters"]])
+
+    @staticmethod
+    def _parse_param(json_data: dict) -> tuple[str, str, str, str, str, str]:
+        name = input_address = output_address = ""
+        osc_type = input_type = output_type = OSCValueType.UNDEFINED
+        # osc_type is the only non-trivial resolved value
+        if j_name := json_data.get('name'):
+            name = j_name
+        if j_input := json_data.get('input'):
+            if j_in_add := j_input.get('address'):
+                input_address = j_in_add
+            if j_in_type := j_input.get('type'):
+                osc_type = input_type = j_in_type
+        if j_output := json_data.get('output'):
+            if j_out_addr := j_output.get('address'):
+                output_address = j_out_addr
+            if j_out_type := j_output.get('type'):
+                osc_type = output_type = j_out_type
+        AvatarSchema._verify(name, output_address, input_type, output_type)
+        return name, input_address, output_address, osc_type, input_type, output_type
+
+    @staticmethod
+    def _verify(name: str, output_address: str, input_type: str, output_type: str):
+        """
+        Sanity check cetain assumptions about a parameter
+        1. It has a name
+        2. It has an output address
+        3. If it has both input and output defined, their types should match.
+        This function is a canary for future vrchat updates
+        :return:
+        """
+        if not name:
+            log.warning("OSC parameter doesn't have a name")
+        if not output_address:
+            # note it's normal that certain parameter do not have an input address.
+            # however, everything should be output by vrchat.
+            log.warning(f"OSC parameter {name} doesn't have a output address.")
+        if input_type != OSCValueType.UNDEFINED and output_type != OSCValueType.UNDEFINED:
+            if input_type != output_type:
+                log.warning(f"Input and output types do not match for OSC parameter {name}.")
+
+
+class AvatarSchemaCache:
+    """
+    Process-wide cache of parsed OSC config files, keyed by path and validated by modification time and size, so
+    several windows on the same avatar parse its file only once and share the schema.
+
+    If cache_dir is set, parsed schemas are also pickled to it and reused by the next launch as long as the config
+    file didn't change.
+    """
+    SIDECAR_VERSION = 1
+    """Bump when AvatarSchema changes, so old sidecars are ignored"""
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        self.cache_dir = cache_dir
+        self._schemas: dict[str, tuple[tuple[int, int], AvatarSchema]] = {}
+
+    def load(self, filename: str) -> AvatarSchema:
+        path = os.path.abspath(filename)
+        st = os.stat(path)
+        key = (st.st_mtime_ns, st.st_size)
+        cached = self._schemas.get(path)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        schema = self._load_sidecar(path, key)
+        if schema is None:
+            with open(path, 'r', encoding='utf-8-sig') as file:
+                schema = AvatarSchema.from_json(json.load(file))
+            self._store_sidecar(path, key, schema)
+        self._schemas[path] = (key, schema)
+        return schema
+
+    def clear(self) -> None:
+        self._schemas.clear()
+
+    def _sidecar_path(self, path: str) -> str:
+        return os.path.join(self.cache_dir, hashlib.sha1(path.encode('utf-8')).hexdigest() + ".pickle")
+
+    def _load_sidecar(self, path: str, key: tuple[int, int]) -> Optional[AvatarSchema]:
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._sidecar_path(path), 'rb') as file:
+                version, sidecar_path, sidecar_key, schema = pickle.load(file)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            log.warning(f"Ignoring unreadable avatar cache of {path}: {e}")
+            return None
+        if version != self.SIDECAR_VERSION or sidecar_path != path or sidecar_key != key:
+            return None
+        return schema
+
+    def _store_sidecar(self, path: str, key: tuple[int, int], schema: AvatarSchema) -> None:
+        if not self.cache_dir:
+            return
+        sidecar = self._sidecar_path(path)
+        tmp_path = None
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # write to a temporary file of its own first, so neither a crash nor another thread storing the same
+            # schema at the same time leaves a truncated sidecar behind
+            fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=self.cache_dir)
+            with os.fdopen(fd, 'wb') as file:
+                pickle.dump((self.SIDECAR_VERSION, path, key, schema), file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, sidecar)
+        except OSError as e:
+            log.warning(f"Couldn't write avatar cache of {path}: {e}")
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+schema_cache = AvatarSchemaCache()
+"""Used by Avatar.load_vrchat_osc_file"""
+
+_EMPTY_SCHEMA = AvatarSchema("", "", ())
 
 
 class Avatar:
-    def __init__(self, osc_service: VrcOscService):
-        self.param_map: dict[str, AvatarParam] = dict()
-        self.osc_map: dict[str, AvatarParam] = dict()
-        self.avatar_id: str = ""
-        self.avatar_name: str = ""
+    """
+    The state of an avatar as described by its AvatarSchema. Values are held in a typed array indexed by the slot of
+    the parameter, so any number of Avatar instances can share a schema and still have their own values.
+
+    AvatarParam is a lightweight view of a slot. The views are created once per parameter and keep no state of their
+    own, so they can be held on to, e.g. by UI models.
+    """
+    def __init__(self, osc_service: VrcOscService, schema: AvatarSchema = _EMPTY_SCHEMA):
         self.osc_service = osc_service
+        self.filename: str = ""
+        """The OSC config the schema was loaded from"""
+        self.type_deadbands: dict[str, float] = dict(DEFAULT_TYPE_DEADBANDS)
+        """Default deadband of the parameters of each OSCValueType, see set_type_deadband"""
+        self._set_schema(schema)
+
+    def _set_schema(self, schema: AvatarSchema, params: Optional[list[AvatarParam]] = None) -> None:
+        self.schema: AvatarSchema = schema
+        self.params: list[AvatarParam] = params or [AvatarParam(self, slot) for slot in range(len(schema))]
+        """The view of every slot"""
+        self.values: array = array('d', bytes(len(schema) * 8))
+        """Current value of every slot. Doubles represent every bool, int and float parameter exactly."""
+        self.notified: array = array('d', self.values)
+        """Value every slot had when its subscribers were last notified"""
+        self.deadbands: array = array('d', (self.type_deadbands.get(osc_type, 0.0) for osc_type in schema.types))
+        """Deadband of every slot, see AvatarParam.deadband"""
+        self.selected: bytearray = bytearray(len(schema))
+        self.translations: list[str] = [""] * len(schema)
+        self._subscribers: dict[int, set[Callable[[Any], None]]] = {}
+        self.param_map: Mapping[str, AvatarParam] = _ParamMapping(self, schema.slot_by_name)
+        """The parameters by name"""
+        self.osc_map: Mapping[str, AvatarParam] = _ParamMapping(self, schema.slot_by_address)
+        """The parameters by the address VRChat sends their updates to"""
+
+    @property
+    def avatar_id(self) -> str:
+        return self.schema.avatar_id
+
+    @property
+    def avatar_name(self) -> str:
+        return self.schema.avatar_name
 
     def load_vrchat_osc_file(self, filename):
-        with open(filename, 'r', encoding='utf-8-sig') as file:
-            j = json.load(file)
-            if j_name := j.get('name'):
-                self.avatar_name = j_name
-            if j_id := j.get('id'):
-                self.avatar_id = j_id
-            for j_param in j["parameters"]:
-                param = AvatarParam(self)
-                param.load_vrchat_osc_file(j_param)
-                if param.name:
-                    self.param_map[param.name] = param
-                if param.output_address:
-                    self.osc_map[param.output_address] = param
+        """
+        Load the schema of the avatar, see AvatarSchemaCache. Only call this on a newly created Avatar.
+        """
+        self._set_schema(schema_cache.load(filename))
+        self.filename = os.path.abspath(filename)
+
+    def update_schema(self, schema: AvatarSchema) -> None:
+        """
+        Switch to a new version of the schema, e.g. after VRChat rewrote the OSC config. Parameters with the same name
+        and type keep their value, selection, translation, subscribers and AvatarParam view. Views of parameters that
+        no longer exist are detached, see AvatarParam.detached.
+        """
+        old_schema, old_params, old_values = self.schema, self.params, self.values
+        old_selected, old_translations, old_subscribers = self.selected, self.translations, self._subscribers
+        old_notified, old_deadbands = self.notified, self.deadbands
+        params = []
+        kept = []
+        for slot, (name, osc_type) in enumerate(zip(schema.names, schema.types)):
+            old_slot = old_schema.slot_by_name.get(name) if name else None
+            if old_slot is not None and old_schema.types[old_slot] == osc_type:
+                param = old_params[old_slot]
+                param.slot = slot
+                kept.append((slot, old_slot))
+            else:
+                param = AvatarParam(self, slot)
+            params.append(param)
+        kept_old_slots = {old_slot for _, old_slot in kept}
+        for old_slot, param in enumerate(old_params):
+            if old_slot not in kept_old_slots:
+                # its old slot belongs to another parameter now
+                param.slot = DETACHED
+        self._set_schema(schema, params)
+        for slot, old_slot in kept:
+            self.values[slot] = old_values[old_slot]
+            self.notified[slot] = old_notified[old_slot]
+            self.deadbands[slot] = old_deadbands[old_slot]
+            self.selected[slot] = old_selected[old_slot]
+            self.translations[slot] = old_translations[old_slot]
+            if subscribers := old_subscribers.get(old_slot):
+                self._subscribers[slot] = subscribers
 
     def receive_osc_message(self, osc_msg: OscMessage) -> None:
         osc_path, _, osc_value = osc_msg
-        if param := self.osc_map.get(osc_path):
-            param.receive_osc_value(osc_value)
+        slot = self.schema.slot_by_address.get(osc_path)
+        if slot is not None:
+            self.params[slot].receive_osc_value(osc_value)
+
+    def receive_osc_messages(self, osc_msgs: list[OscMessage]) -> None:
+        """
+        Batch handler for OscRouter.subscribe_batch, see apply_many.
+        """
+        self.apply_many((osc_path, osc_value) for osc_path, _, osc_value in osc_msgs)
+
+    def apply_many(self, updates: Iterable[tuple[str, Any]]) -> None:
+        """
+        Store many received values at once, e.g. all messages of a bundle. Every value goes through the converter of its
+        slot. Subscribers are notified once all values are stored, once per parameter even if it was updated several
+        times.
+        :param updates: pairs of output address and value, unknown addresses are skipped
+        """
+        slot_by_address = self.schema.slot_by_address
+        converters = self.schema.converters
+        values = self.values
+        updated: dict[int, None] = {}
+        for address, value in updates:
+            slot = slot_by_address.get(address)
+            if slot is None or (converter := converters[slot]) is None:
+                continue
+            try:
+                values[slot] = converter(value)
+            except _COERCE_ERRORS as e:
+                log.warning(f"Ignoring value {value!r} for {address}: {e}")
+                continue
+            updated[slot] = None
+        for slot in updated:
+            if self._is_meaningful_change(slot):
+                self._notify_subscriber(slot)
+
+    def set_type_deadband(self, osc_type: str, deadband: float) -> None:
+        """
+        Set the deadband of all parameters of the OSCValueType, including those added by later schema updates.
+        """
+        self.type_deadbands[osc_type] = deadband
+        for slot, slot_type in enumerate(self.schema.types):
+            if slot_type == osc_type:
+                self.deadbands[slot] = deadband
+
+    def _is_meaningful_change(self, slot: int) -> bool:
+        value = self.values[slot]
+        notified = self.notified[slot]
+        if value == notified:
+            return False
+        # coming to rest or reaching the end of the range is always passed on, however small the step
+        return abs(value - notified) > self.deadbands[slot] or value == 0.0 or value == 1.0 or value == -1.0
+
+    def snapshot(self) -> array:
+        """
+        :return: a copy of the values of all parameters, see diff and reset
+        """
+        return array('d', self.values)
+
+    def diff(self, snapshot: array) -> list[AvatarParam]:
+        """
+        :return: the parameters whose value differs from the snapshot
+        """
+        return [self.params[slot] for slot, (value, old) in enumerate(zip(self.values, snapshot)) if value != old]
+
+    def reset(self, snapshot: Optional[array] = None) -> None:
+        """
+        Set all parameters back to the values of the snapshot, or to 0 if none is given. Only the parameters that
+        differ are set, which sends them to VRChat and notifies their subscribers.
+        """
+        if snapshot is None:
+            snapshot = array('d', bytes(len(self.values) * self.values.itemsize))
+        for param in self.diff(snapshot):
+            param.value = snapshot[param.slot]
+
+    def subscribe(self, slot: int, subscriber: Callable[[Any], None]) -> None:
+        self._subscribers.setdefault(slot, set()).add(subscriber)
+
+    def unsubscribe(self, slot: int, subscriber: Callable[[Any], None]) -> None:
+        subscribers = self._subscribers[slot]
+        subscribers.remove(subscriber)
+        if not subscribers:
+            del self._subscribers[slot]
+
+    def _notify_subscriber(self, slot: int) -> None:
+        self.notified[slot] = self.values[slot]
+        subscribers = self._subscribers.get(slot)
+        if not subscribers:
+            return
+        value = self.params[slot].value
+        for s in list(subscribers):
+            try:
+                s(value)
+            except Exception as e:
+                log.error(f"During notifying subscribers of {self.schema.names[slot]}, an exception occured: {e}")
+
+
+class _ParamMapping(Mapping):
+    """
+    Read-only mapping from a name or address to the view of its slot.
+    """
+    __slots__ = ("_avatar", "_slots")
+
+    def __init__(self, avatar: Avatar, slots: dict[str, int]):
+        self._avatar = avatar
+        self._slots = slots
+
+    def __getitem__(self, key: str) -> AvatarParam:
+        return self._avatar.params[self._slots[key]]
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._slots
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._slots)
+
+    def __len__(self) -> int:
+        return len(self._slots)
 
 
 class AvatarParam:
     """
     Holds values from the VRChat generated OSC info files. Names are based on the property names used in the file,
     so in/out is from the view of VRChat.
+
+    A view of one slot of Avatar. All attributes are read from the schema or read from and written to the arrays of the
+    avatar.
     """
-    def __init__(self, avatar: Avatar) -> None:
-        super().__init__()
+    __slots__ = ("avatar", "slot")
+
+    def __init__(self, avatar: Avatar, slot: int) -> None:
         self.avatar = avatar
-        # default values for json data
-        self.name = ""
+        self.slot = slot
+
+    @property
+    def detached(self) -> bool:
+        """
+        The parameter was removed from the avatar or changed its type, see Avatar.update_schema. Detached views read
+        as empty and ignore writes, so views held e.g. by controllers can't touch the parameter that took their slot.
+        """
+        return self.slot < 0
+
+    def _get(self, values, default):
+        slot = self.slot
+        return default if slot < 0 else values[slot]
+
+    @property
+    def name(self) -> str:
         """This is the name of the property as defined during avatar making."""
-        self.translation = ""
-        """This value is generated by the program and not provided by VRChat"""
-        self.input_address = ""
+        return self._get(self.avatar.schema.names, "")
+
+    @property
+    def input_address(self) -> str:
         """
         [Can be empty string]
         This is the OSC path to send to VRChat. If it is empty, then VRC doesn't accept OSC messages for it. Currently,
         this means that this avatar parameter is not defined by the avatar creator, but created by the system.
         This includes basic avatar properties like moving around and all physbone derived parameters like _isGrabbed
         """
-        self.output_address = ""
+        return self._get(self.avatar.schema.input_addresses, "")
+
+    @property
+    def output_address(self) -> str:
         """
         [Can be empty string]
         This is the OSC path to receive updates from VRChat.
         """
-        self.osc_type = OSCValueType.UNDEFINED
-        self.osc_input_type = OSCValueType.UNDEFINED
+        return self._get(self.avatar.schema.output_addresses, "")
+
+    @property
+    def osc_type(self) -> str:
+        return self._get(self.avatar.schema.types, "")
+
+    @property
+    def osc_input_type(self) -> str:
         """Read from the VRChat json. Use osc_type instead."""
-        self.osc_output_type = OSCValueType.UNDEFINED
+        return self._get(self.avatar.schema.input_types, "")
+
+    @property
+    def osc_output_type(self) -> str:
         """Read from the VRChat json. Use osc_type instead."""
-        self._value: int | float | bool = 0.0
-        self.selected: bool = False
-        self.subscriber: set[Callable[[Any], None]] = set()
+        return self._get(self.avatar.schema.output_types, "")
+
+    @property
+    def osc_template(self) -> Optional[OscMessageTemplate]:
+        """Encoded address and type tag used to send this parameter."""
+        return self._get(self.avatar.schema.templates, None)
+
+    @property
+    def translation(self) -> str:
+        """This value is generated by the program and not provided by VRChat"""
+        return self._get(self.avatar.translations, "")
+
+    @translation.setter
+    def translation(self, translation: str) -> None:
+        if self.slot >= 0:
+            self.avatar.translations[self.slot] = translation
+
+    @property
+    def selected(self) -> bool:
+        return bool(self._get(self.avatar.selected, 0))
+
+    @selected.setter
+    def selected(self, selected: bool) -> None:
+        if self.slot >= 0:
+            self.avatar.selected[self.slot] = 1 if selected else 0
 
     @property
     def value(self):
-        return self._value
+        """None once detached"""
+        if self.slot < 0:
+            return None
+        value = self.avatar.values[self.slot]
+        reader = self.avatar.schema.readers[self.slot]
+        return value if reader is None else reader(value)
 
     @value.setter
     def value(self, value: bool | float | bool):
+        if self.slot < 0:
+            log.warning(f"Ignoring value {value!r} for a parameter that was removed from {self.avatar.avatar_name}")
+            return
         coerced_value = self._coerce(value)
-        if coerced_value == self._value:
+        if coerced_value is None or coerced_value == self.avatar.values[self.slot]:
             return
-        self._value = coerced_value
-        self.avatar.osc_service.send(self.output_address, self.osc_type, value)
-        self._notify_subscriber()
+        self.avatar.values[self.slot] = coerced_value
+        template = self.osc_template
+        if template is not None:
+            self.avatar.osc_service.send_template(template, coerced_value)
+        self.avatar._notify_subscriber(self.slot)
+
+    @property
+    def deadband(self) -> float:
+        """
+        Received values within this distance of the value last passed on are stored without notifying the
+        subscribers. VRChat keeps resending floats that barely move, e.g. VelocityX while standing still. 0, 1 and -1
+        are always passed on.
+        """
+        return self._get(self.avatar.deadbands, 0.0)
+
+    @deadband.setter
+    def deadband(self, deadband: float) -> None:
+        if self.slot >= 0:
+            self.avatar.deadbands[self.slot] = deadband
 
     def subscribe(self, subscriber: Callable[[Any], None]) -> None:
-        self.subscriber.add(subscriber)
+        if self.slot >= 0:
+            self.avatar.subscribe(self.slot, subscriber)
 
     def unsubscribe(self, subscriber: Callable[[Any], None]) -> None:
-        self.subscriber.remove(subscriber)
-
-    def _notify_subscriber(self):
-        for s in self.subscriber:
-            try:
-                s(self._value)
-            except Exception as e:
-                print(f"During notifying subscribers of {self.name}, an exception occured: {e}")
+        # detached views lost their subscribers together with their slot
+        if self.slot >= 0:
+            self.avatar.unsubscribe(self.slot, subscriber)
 
     def receive_osc_value(self, value: Any):
-        coerced = self._coerce(value)
-        self._value = coerced
-        self._notify_subscriber()
-
-    def load_vrchat_osc_file(self, json_data):
-        # osc_type is the only non-trivial resolved value
-        if j_name := json_data.get('name'):
-            self.name = j_name
-        if j_input := json_data.get('input'):
-            if j_in_add := j_input.get('address'):
-                self.input_address = j_in_add
-            if j_in_type := j_input.get('type'):
-                self.osc_type = j_in_type
-                self.osc_input_type = j_in_type
-        if j_output := json_data.get('output'):
-            if j_out_addr := j_output.get('address'):
-                self.output_address = j_out_addr
-            if j_out_type := j_output.get('type'):
-                self.osc_type = j_out_type
-                self.osc_output_type = j_out_type
-
-        self._value = self._coerce(0)
-        self._verify()
+        if self.slot < 0:
+            return
+        converted = self._coerce(value, self.avatar.schema.converters)
+        if converted is None:
+            return
+        self.avatar.values[self.slot] = converted
+        if self.avatar._is_meaningful_change(self.slot):
+            self.avatar._notify_subscriber(self.slot)
 
-    def _coerce(self, new_value: Any) -> bool | float | int:
+    def _coerce(self, new_value: Any, coercers: Optional[tuple] = None) -> Optional[bool | float | int]:
         """
-        Convert the value to the type of this avatar parameter.
+        Convert the value to the type of this avatar parameter and clamp it to the range VRChat accepts, see COERCERS.
         :param new_value: New value that can be of a different type
-        :return: None
+        :param coercers: coercers by slot to use instead, e.g. AvatarSchema.converters for received values
+        :return: the converted value or None if it can't be converted
         """
+        if coercers is None:
+            coercers = self.avatar.schema.coercers
+        coercer = coercers[self.slot]
+        if coercer is None:
+            return None
         try:
-            match self.osc_type:
-                case OSCValueType.INT:
-                    return int(new_value)
-                case OSCValueType.FLOAT:
-                    return float(new_value)
-                case OSCValueType.BOOL:
-                    return bool(new_value)
-        except Exception as e:
-            print(f"Trying to coerce value {str(new_value)} into {self.osc_type} threw Error {str(e)}")
-
-    def _verify(self):
-        """
-        Sanity check cetain assumptions about a parameter
-        1. It has a name
-        2. It has an output address
-        3. If it has both input and output defined, their types should match.
-        This function is a canary for future vrchat updates
-        :return:
-        """
-        if not self.name:
-            print("OSC parameter doesn't have a name")
-        if not self.output_address:
-            # note it's normal that certain parameter do not have an input address.
-            # however, everything should be output by vrchat.
-            print("OSC parameter doesn't have a output address.")
-        if self.osc_input_type and self.osc_output_type:
-            if self.osc_input_type != self.osc_input_type:
-                print("Input and output types do not match for OSC parameter.")
+            return coercer(new_value)
+        except _COERCE_ERRORS as e:
+            log.warning(f"Trying to coerce value {new_value!r} into {self.osc_type} threw Error {e}")
+            return None
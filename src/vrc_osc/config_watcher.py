@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import logging
+import os
+from typing import Optional
+
+from PyQt6.QtCore import QObject, pyqtSignal, QFileSystemWatcher, QTimer, QRunnable, QThreadPool, pyqtSlot
+
+from src.vrc_osc.avatar import AvatarSchemaCache, schema_cache as default_schema_cache
+
+log = logging.getLogger(__name__)
+
+
+class _ParseTaskSignals(QObject):
+    done = pyqtSignal(str, object)
+    failed = pyqtSignal(str, object)
+
+
+class _ParseTask(QRunnable):
+    """
+    Parses an OSC config file through the schema cache. The done signal is emitted with the path and the AvatarSchema,
+    the failed signal with the path and the exception.
+    """
+    def __init__(self, path: str, schema_cache: AvatarSchemaCache):
+        super().__init__()
+        self.path = path
+        self.schema_cache = schema_cache
+        self.signals = _ParseTaskSignals()
+
+    @pyqtSlot()
+    def run(self):
+        try:
+            schema = self.schema_cache.load(self.path)
+        except Exception as e:
+            self.signals.failed.emit(self.path, e)
+            return
+        self.signals.done.emit(self.path, schema)
+
+
+class OscConfigWatcher(QObject):
+    """
+    Watches the OSC directory of VRChat, <OSC directory>/<user id>/Avatars/<avatar id>.json, for new and changed avatar
+    configs.
+
+    VRChat writes the configs while the avatar loads, so a file is only parsed once its size and modification time
+    stayed the same for debounce_ms. It is parsed on a worker thread and config_changed is emitted with its path and
+    AvatarSchema. Files that can't be parsed yet are retried up to max_retries times.
+    """
+    config_changed = pyqtSignal(str, object)
+
+    def __init__(self, osc_dir: str, debounce_ms: int = 500, max_retries: int = 5,
+                 schema_cache: AvatarSchemaCache = default_schema_cache, parent: QObject | None = None):
+        super().__init__(parent)
+        self.osc_dir = os.path.abspath(osc_dir)
+        self.max_retries = max_retries
+        self.schema_cache = schema_cache
+        self.threadpool = QThreadPool()
+        self.threadpool.setMaxThreadCount(1)
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.directoryChanged.connect(self._directory_changed)
+        self._watcher.fileChanged.connect(self._file_changed)
+        self._known: dict[str, tuple[int, int]] = {}
+        """Size and modification time of every config, as last parsed or seen"""
+        self._pending: dict[str, Optional[tuple[int, int]]] = {}
+        """Changed configs and their size and modification time at the last check, None if not checked yet"""
+        self._retries: dict[str, int] = {}
+        self._debounce_timer = QTimer(self)
+        self._debounce_timer.setSingleShot(True)
+        self._debounce_timer.setInterval(debounce_ms)
+        self._debounce_timer.timeout.connect(self._check_pending)
+
+        if os.path.isdir(self.osc_dir):
+            self._watcher.addPath(self.osc_dir)
+            self._scan_osc_dir(report=False)
+        else:
+            log.warning(f"OSC directory {self.osc_dir} doesn't exist, avatar configs are not watched")
+
+    def close(self) -> None:
+        self._debounce_timer.stop()
+        self.threadpool.clear()
+        self.threadpool.waitForDone()
+
+    def _scan_osc_dir(self, report: bool) -> None:
+        for user_id in os.listdir(self.osc_dir):
+            avatars_dir = os.path.join(self.osc_dir, user_id, "Avatars")
+            if os.path.isdir(avatars_dir):
+                if avatars_dir not in self._watcher.directories():
+                    self._watcher.addPath(avatars_dir)
+                self._scan_avatars_dir(avatars_dir, report)
+
+    def _scan_avatars_dir(self, avatars_dir: str, report: bool) -> None:
+        """
+        Watch all configs in the directory. With report, every new or changed one is queued for parsing.
+        """
+        try:
+            entries = list(os.scandir(avatars_dir))
+        except OSError:
+            return
+        watched = set(self._watcher.files())
+        for entry in entries:
+            if not entry.name.endswith(".json") or not entry.is_file():
+                continue
+            path = entry.path
+            if path not in watched:
+                self._watcher.addPath(path)
+            st = entry.stat()
+            if report and self._known.get(path) != (st.st_mtime_ns, st.st_size):
+                self._queue(path)
+            elif not report:
+                self._known[path] = (st.st_mtime_ns, st.st_size)
+
+    def _directory_changed(self, path: str) -> None:
+        if path == self.osc_dir:
+            # a new user logged in
+            self._scan_osc_dir(report=True)
+        else:
+            self._scan_avatars_dir(path, report=True)
+
+    def _file_changed(self, path: str) -> None:
+        # replacing a file removes it from the watcher on some platforms
+        if os.path.exists(path) and path not in self._watcher.files():
+            self._watcher.addPath(path)
+        self._queue(path)
+
+    def _queue(self, path: str) -> None:
+        # start over, the file is only stable once it didn't change for a whole interval
+        self._pending[path] = None
+        self._debounce_timer.start()
+
+    def _check_pending(self) -> None:
+        for path, last_seen in list(self._pending.items()):
+            try:
+                st = os.stat(path)
+            except OSError:
+                # deleted again
+                del self._pending[path]
+                continue
+            current = (st.st_mtime_ns, st.st_size)
+            if current != last_seen:
+                self._pending[path] = current
+                continue
+            del self._pending[path]
+            if self._known.get(path) == current:
+                continue
+            self._known[path] = current
+            self._parse(path)
+        if self._pending:
+            self._debounce_timer.start()
+
+    def _parse(self, path: str) -> None:
+        task = _ParseTask(path, self.schema_cache)
+        task.signals.done.connect(self._parsed)
+        task.signals.failed.connect(self._parse_failed)
+        self.threadpool.start(task)
+
+    def _parsed(self, path: str, schema) -> None:
+        self._retries.pop(path, None)
+        self.config_changed.emit(path, schema)
+
+    def _parse_failed(self, path: str, e: Exception) -> None:
+        retries = self._retries.get(path, 0) + 1
+        if retries > self.max_retries:
+            self._retries.pop(path, None)
+            log.error(f"Giving up on reading avatar config {path}: {e}")
+            return
+        log.debug(f"Avatar config {path} isn't readable yet, retrying: {e}")
+        self._retries[path] = retries
+        # forget the file, so the next check parses it again
+        self._known.pop(path, None)
+        self._queue(path)
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import logging
+from typing import Callable, Iterable
+
+from src.vrc_osc.vrc_osc import OscMessage
+
+log = logging.getLogger(__name__)
+
+type OscHandler = Callable[[OscMessage], None]
+type OscBatchHandler = Callable[[list[OscMessage]], None]
+
+_ROUTE_CACHE_LIMIT = 4096
+
+
+class _BatchSubscription:
+    """
+    Wraps a handler subscribed with OscRouter.subscribe_batch. Called like any other handler by dispatch, but
+    dispatch_many collects its messages and hands them over in one call.
+    """
+    __slots__ = ("handler",)
+
+    def __init__(self, handler: OscBatchHandler):
+        self.handler = handler
+
+    def __call__(self, osc_msg: OscMessage) -> None:
+        self.handler([osc_msg])
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, _BatchSubscription) and self.handler == other.handler
+
+    def __hash__(self) -> int:
+        return hash(self.handler)
+
+
+class OscRouter:
+    """
+    Dispatches OSC messages only to the handlers subscribed to their address.
+
+    Subscriptions are either
+     1. an exact address like "/avatar/parameters/VelocityX"
+     2. a prefix ending in "*" like "/avatar/parameters/*". "*" alone matches every address.
+
+    The handlers for an address are resolved the first time a message for it arrives and cached until the
+    subscriptions change, so dispatching is a single dict lookup no matter how many handlers are subscribed.
+
+    Handlers subscribed with subscribe_batch get all their messages of a dispatch_many call at once.
+    """
+
+    def __init__(self):
+        self._exact: dict[str, list[OscHandler]] = {}
+        self._prefixes: list[tuple[str, OscHandler]] = []
+        self._routes: dict[str, tuple[OscHandler, ...]] = {}
+
+    def subscribe(self, handler: OscHandler, address: str = "*") -> None:
+        if address.endswith("*"):
+            self._prefixes.append((address[:-1], handler))
+        else:
+            self._exact.setdefault(address, []).append(handler)
+        self._routes.clear()
+
+    def subscribe_many(self, handler: OscHandler, addresses: Iterable[str]) -> None:
+        for address in addresses:
+            self.subscribe(handler, address)
+
+    def unsubscribe(self, handler: OscHandler, address: str = "*") -> None:
+        """
+        :raises ValueError: if the handler isn't subscribed to the address
+        """
+        if address.endswith("*"):
+            self._prefixes.remove((address[:-1], handler))
+        else:
+            handlers = self._exact.get(address)
+            if handlers is None:
+                raise ValueError(f"{handler} is not subscribed to {address}")
+            handlers.remove(handler)
+            if not handlers:
+                del self._exact[address]
+        self._routes.clear()
+
+    def unsubscribe_many(self, handler: OscHandler, addresses: Iterable[str]) -> None:
+        for address in addresses:
+            self.unsubscribe(handler, address)
+
+    def subscribe_batch(self, handler: OscBatchHandler, addresses: Iterable[str]) -> None:
+        self.subscribe_many(_BatchSubscription(handler), addresses)
+
+    def unsubscribe_batch(self, handler: OscBatchHandler, addresses: Iterable[str]) -> None:
+        self.unsubscribe_many(_BatchSubscription(handler), addresses)
+
+    def handlers_for(self, address: str) -> tuple[OscHandler, ...]:
+        handlers = self._routes.get(address)
+        if handlers is None:
+            handlers = tuple(self._exact.get(address, ())) + tuple(
+                handler for prefix, handler in self._prefixes if address.startswith(prefix)
+            )
+            if len(self._routes) >= _ROUTE_CACHE_LIMIT:
+                self._routes.clear()
+            self._routes[address] = handlers
+        return handlers
+
+    def dispatch(self, osc_msg: OscMessage) -> None:
+        for handler in self.handlers_for(osc_msg[0]):
+            try:
+                handler(osc_msg)
+            except Exception as e:
+                log.error(f"Error while dispatching OSC Message {osc_msg[0]}: {e}")
+
+    def dispatch_many(self, osc_msgs: Iterable[OscMessage]) -> None:
+        """
+        Dispatch messages that were received together, e.g. the messages of a bundle. Batch handlers are called once
+        all messages went through the other handlers, each with its messages in the order they were received.
+        """
+        batches: dict[_BatchSubscription, list[OscMessage]] = {}
+        for osc_msg in osc_msgs:
+            for handler in self.handlers_for(osc_msg[0]):
+                if type(handler) is _BatchSubscription:
+                    batches.setdefault(handler, []).append(osc_msg)
+                    continue
+                try:
+                    handler(osc_msg)
+                except Exception as e:
+                    log.error(f"Error while dispatching OSC Message {osc_msg[0]}: {e}")
+        for subscription, batch in batches.items():
+            try:
+                subscription.handler(batch)
+            except Exception as e:
+                log.error(f"Error while dispatching {len(batch)} OSC Messages: {e}")
@@ -1,26 +1,39 @@
+import heapq
+import itertools
+import logging
+import socket
 import struct
+import sys
+import threading
+import time
 import typing
-from typing import Optional, Callable
+from collections import deque
+from typing import Optional, Callable, Iterator, Iterable
 
-from PyQt6.QtCore import QObject
+from PyQt6.QtCore import QObject, QTimer
 from PyQt6.QtNetwork import QUdpSocket, QHostAddress
 
+log = logging.getLogger(__name__)
+
 
 class OSCValueType:
     FLOAT: str = "Float"
     BOOL: str = "Bool"
     INT: str = "Int"
+    STRING: str = "String"
+    """Not used by avatar parameters, but by messages like /avatar/change"""
     UNDEFINED: str = "Undefined"
 
     single_letter = {
         FLOAT: "F",
         BOOL: "B",
         INT: "I",
+        STRING: "S",
         UNDEFINED: "?"
     }
 
 
-type OscPyTypes = typing.Union[bool | float | int]
+type OscPyTypes = typing.Union[bool | float | int | str]
 
 type OscMessage = tuple[str, str, OscPyTypes]
 
@@ -30,12 +43,23 @@ def print_to_stdout_handler(osc_msg: OscMessage) -> None:
     print(osc_path + " " + str(osc_value))
 
 
-def encode_osc_message(osc_msg: OscMessage) -> bytes:
-    (osc_path, osc_value_type, osc_value) = osc_msg
+AVATAR_CHANGE_ADDRESS = "/avatar/change"
+"""VRChat sends the id of the new avatar to this address as string whenever the user switches avatars"""
 
+_INT32 = struct.Struct(">i")
+_FLOAT32 = struct.Struct(">f")
+
+
+def _encode_osc_address(osc_path: str) -> bytes:
     osc_path_bytes = osc_path.encode('ascii', errors='backslashreplace')
     # zero terminator and 4-byte align
-    osc_path_bytes += b'\x00' * (4 - len(osc_path_bytes) % 4)
+    return osc_path_bytes + b'\x00' * (4 - len(osc_path_bytes) % 4)
+
+
+def encode_osc_message(osc_msg: OscMessage) -> bytes:
+    (osc_path, osc_value_type, osc_value) = osc_msg
+
+    osc_path_bytes = _encode_osc_address(osc_path)
 
     match osc_value_type:
         case OSCValueType.BOOL:
@@ -44,25 +68,97 @@ def encode_osc_message(osc_msg: OscMessage) -> bytes:
             else:
                 return osc_path_bytes + b',F\x00\x00'
         case OSCValueType.FLOAT:
-            return osc_path_bytes + b',f\x00\x00' + struct.pack(">f", osc_value)
+            return osc_path_bytes + b',f\x00\x00' + _FLOAT32.pack(osc_value)
         case OSCValueType.INT:
-            return osc_path_bytes + b',i\x00\x00' + struct.pack(">i", osc_value)
-
-
-def decode_osc_message(osc_bytes: bytes) -> Optional[OscMessage]:
-    osc_path: str
-    i = 0
-    path_end = 0
-    while i < len(osc_bytes):
-        if osc_bytes[i] == 0:
-            path_end = i
-            break
-        i = i + 1
-    else:  # format violation
-        return
+            return osc_path_bytes + b',i\x00\x00' + _INT32.pack(osc_value)
+        case OSCValueType.STRING:
+            string_bytes = osc_value.encode('utf-8')
+            return osc_path_bytes + b',s\x00\x00' + string_bytes + b'\x00' * (4 - len(string_bytes) % 4)
+
+
+class OscMessageTemplate:
+    """
+    An OSC message with the address and type tag encoded ahead of time. Packing a value only writes the 4-byte payload
+    into a buffer that is reused for every message, so the returned buffer is only valid until the next call of pack.
+    """
+    __slots__ = ("osc_path", "value_type", "_buffer", "_payload_offset", "_packer", "_true_bytes", "_false_bytes")
+
+    def __init__(self, osc_path: str, value_type: str):
+        self.osc_path = osc_path
+        self.value_type = value_type
+        self._buffer: Optional[bytearray] = None
+        self._payload_offset = 0
+        self._packer: Optional[struct.Struct] = None
+        self._true_bytes = b""
+        self._false_bytes = b""
+
+        osc_path_bytes = _encode_osc_address(osc_path)
+        match value_type:
+            case OSCValueType.BOOL:
+                self._true_bytes = osc_path_bytes + b',T\x00\x00'
+                self._false_bytes = osc_path_bytes + b',F\x00\x00'
+            case OSCValueType.FLOAT:
+                self._packer = _FLOAT32
+                self._buffer = bytearray(osc_path_bytes + b',f\x00\x00\x00\x00\x00\x00')
+            case OSCValueType.INT:
+                self._packer = _INT32
+                self._buffer = bytearray(osc_path_bytes + b',i\x00\x00\x00\x00\x00\x00')
+        if self._buffer is not None:
+            self._payload_offset = len(self._buffer) - 4
+
+    def pack(self, osc_value: OscPyTypes) -> Optional[bytes | bytearray]:
+        """
+        :param osc_value: value matching the value type of this template
+        :return: the encoded message or None if the value type can't be sent
+        """
+        if self._packer is not None:
+            self._packer.pack_into(self._buffer, self._payload_offset, osc_value)
+            return self._buffer
+        if self.value_type == OSCValueType.BOOL:
+            return self._true_bytes if osc_value else self._false_bytes
+        return None
 
-    osc_path = osc_bytes[0:path_end].decode("unicode-escape")
-    j = 4 * (path_end // 4 + 1) + 1
+
+_ADDRESS_CACHE_LIMIT = 4096
+_address_cache: dict[bytes, str] = {}
+"""
+Maps the raw, still escaped address bytes to the decoded address. VRChat sends the same few hundred addresses over and
+over, so once an address has been seen it never has to be decoded again.
+"""
+
+
+def _intern_address(raw_address: memoryview) -> str:
+    # read-only memoryviews hash and compare like bytes, so looking them up doesn't copy
+    key = raw_address if raw_address.readonly else raw_address.tobytes()
+    osc_path = _address_cache.get(key)
+    if osc_path is None:
+        if len(_address_cache) >= _ADDRESS_CACHE_LIMIT:
+            _address_cache.clear()
+        osc_path = sys.intern(str(raw_address, "unicode-escape"))
+        _address_cache[raw_address.tobytes()] = osc_path
+    return osc_path
+
+
+def decode_osc_message(osc_bytes: bytes | bytearray, start: int = 0, stop: int | None = None) -> Optional[OscMessage]:
+    """
+    Decode a single OSC message.
+    :param osc_bytes: buffer containing the message
+    :param start: offset of the message inside osc_bytes
+    :param stop: end of the message inside osc_bytes, defaults to the end of the buffer
+    :return: the decoded message or None if the message is malformed or of an unsupported type
+    """
+    if stop is None:
+        stop = len(osc_bytes)
+    path_end = osc_bytes.find(b'\x00', start, stop)
+    if path_end < 0:  # format violation
+        return None
+
+    view = memoryview(osc_bytes)
+    osc_path = _intern_address(view[start:path_end])
+    # skip the zero terminator, padding and the ',' of the type tag
+    j = start + 4 * ((path_end - start) // 4 + 1) + 1
+    if j >= stop:
+        return None
 
     match osc_bytes[j]:
         case 84:  # b'T'[0]
@@ -70,9 +166,307 @@ def decode_osc_message(osc_bytes: bytes) -> Optional[OscMessage]:
         case 70:  # b'F'[0]
             return osc_path, OSCValueType.BOOL, False
         case 105:  # b'i'[0]
-            return osc_path, OSCValueType.INT, struct.unpack(">i", osc_bytes[j + 3:j + 7])[0]
+            if j + 7 > stop:
+                return None
+            return osc_path, OSCValueType.INT, _INT32.unpack_from(osc_bytes, j + 3)[0]
         case 102:  # b'f'[0]
-            return osc_path, OSCValueType.FLOAT, struct.unpack(">f", osc_bytes[j + 3:j + 7])[0]
+            if j + 7 > stop:
+                return None
+            return osc_path, OSCValueType.FLOAT, _FLOAT32.unpack_from(osc_bytes, j + 3)[0]
+        case 115:  # b's'[0]
+            string_end = osc_bytes.find(b'\x00', j + 3, stop)
+            if string_end < 0:
+                return None
+            return osc_path, OSCValueType.STRING, bytes(osc_bytes[j + 3:string_end]).decode('utf-8', errors='replace')
+    return None
+
+
+_BUNDLE_TAG = b"#bundle\x00"
+_TIMETAG = struct.Struct(">Q")
+_MAX_BUNDLE_DEPTH = 8
+_NTP_UNIX_EPOCH_DELTA = 2208988800
+"""Seconds between the NTP epoch (1900) used by OSC timetags and the unix epoch (1970)"""
+
+OSC_IMMEDIATELY = 1
+"""The special timetag meaning 'process as soon as received'."""
+
+
+def osc_timetag_to_time(timetag: int) -> float:
+    """
+    :return: the timetag as unix timestamp as used by time.time()
+    """
+    return (timetag >> 32) - _NTP_UNIX_EPOCH_DELTA + (timetag & 0xFFFFFFFF) / 0x100000000
+
+
+def iter_osc_packet(osc_bytes: bytes | bytearray, start: int = 0,
+                    stop: int | None = None) -> Iterator[tuple[int, Optional[OscMessage]]]:
+    """
+    Walk a received packet, which is either a single message or a bundle, and yield every message in it. Nested
+    bundles are walked in place without copying the buffer.
+    :param osc_bytes: buffer containing the packet
+    :param start: offset of the packet inside osc_bytes
+    :param stop: end of the packet inside osc_bytes, defaults to the end of the buffer
+    :return: pairs of the timetag of the enclosing bundle (OSC_IMMEDIATELY for plain messages) and the message. The
+        message is None for malformed or unsupported elements, the rest of a malformed bundle is skipped.
+    """
+    if stop is None:
+        stop = len(osc_bytes)
+    if osc_bytes.startswith(_BUNDLE_TAG, start, stop):
+        yield from _iter_osc_bundle(osc_bytes, start, stop, 0)
+    else:
+        yield OSC_IMMEDIATELY, decode_osc_message(osc_bytes, start, stop)
+
+
+def _iter_osc_bundle(osc_bytes: bytes | bytearray, start: int, stop: int,
+                     depth: int) -> Iterator[tuple[int, Optional[OscMessage]]]:
+    if depth > _MAX_BUNDLE_DEPTH or stop - start < 16:
+        yield OSC_IMMEDIATELY, None
+        return
+    timetag = _TIMETAG.unpack_from(osc_bytes, start + 8)[0]
+    i = start + 16
+    while i < stop:
+        if i + 4 > stop:
+            yield timetag, None
+            return
+        element_size = _INT32.unpack_from(osc_bytes, i)[0]
+        i += 4
+        if element_size < 0 or i + element_size > stop:
+            yield timetag, None
+            return
+        if osc_bytes.startswith(_BUNDLE_TAG, i, i + element_size):
+            yield from _iter_osc_bundle(osc_bytes, i, i + element_size, depth + 1)
+        else:
+            yield timetag, decode_osc_message(osc_bytes, i, i + element_size)
+        i += element_size
+
+
+class OscBundleScheduler(QObject):
+    """
+    Holds back messages of bundles with a timetag in the future and dispatches them in timetag order once they are due.
+    Messages that are already due are dispatched right away. A single timer is armed for the earliest pending message.
+    """
+
+    def __init__(self, dispatch: Callable[[OscMessage], None], max_delay: float = 1.0,
+                 clock: Callable[[], float] = time.time):
+        """
+        :param dispatch: called with every message once it is due
+        :param max_delay: timetags further in the future than this many seconds are treated as if they were
+            max_delay seconds in the future. Protects against senders with a skewed clock.
+        :param clock: source of the current unix time
+        """
+        super(QObject, self).__init__()
+        self.dispatch = dispatch
+        self.max_delay = max_delay
+        self.clock = clock
+        self._pending: list[tuple[float, int, OscMessage]] = []
+        self._sequence = itertools.count()
+        """tie-breaker, so messages with the same timetag keep the order they were received in"""
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self.dispatch_due)
+
+    def schedule(self, timetag: int, osc_msg: OscMessage) -> None:
+        now = self.clock()
+        if timetag == OSC_IMMEDIATELY:
+            due = now
+        else:
+            due = min(osc_timetag_to_time(timetag), now + self.max_delay)
+        heapq.heappush(self._pending, (due, next(self._sequence), osc_msg))
+        if due <= now:
+            self.dispatch_due()
+        else:
+            self._arm_timer(now)
+
+    def dispatch_due(self) -> None:
+        now = self.clock()
+        while self._pending and self._pending[0][0] <= now:
+            self.dispatch(heapq.heappop(self._pending)[2])
+        self._arm_timer(now)
+
+    def flush(self) -> None:
+        """
+        Dispatch all pending messages in timetag order, regardless of whether they are due.
+        """
+        self._timer.stop()
+        while self._pending:
+            self.dispatch(heapq.heappop(self._pending)[2])
+
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    def _arm_timer(self, now: float) -> None:
+        if not self._pending:
+            self._timer.stop()
+            return
+        self._timer.start(max(0, int((self._pending[0][0] - now) * 1000)))
+
+
+_RECEIVER_DRAIN_INTERVAL_MS = 16
+"""How often messages received by a ThreadedOscReceiver are handled, about once per frame at 60 fps"""
+
+_MAX_DATAGRAM_SIZE = 1400
+"""Outgoing bundles are kept below this size, so they fit into a single ethernet frame with IP and UDP headers."""
+
+
+def encode_osc_bundles(messages: Iterable[bytes | bytearray], timetag: int = OSC_IMMEDIATELY,
+                       max_size: int = _MAX_DATAGRAM_SIZE) -> Iterator[bytes]:
+    """
+    Pack encoded messages into as few bundles as possible without exceeding max_size bytes per bundle. A bundle with
+    only a single message is sent as that plain message instead.
+    :param messages: encoded messages
+    :param timetag: timetag of all bundles
+    :param max_size: maximum size of a bundle in bytes. Messages that are too large on their own are sent as is.
+    :return: the datagrams to send
+    """
+    header = _BUNDLE_TAG + _TIMETAG.pack(timetag)
+    elements: list[bytes | bytearray] = []
+    size = len(header)
+    for osc_bytes in messages:
+        element_size = 4 + len(osc_bytes)
+        if elements and size + element_size > max_size:
+            yield _join_bundle(header, elements)
+            elements = []
+            size = len(header)
+        elements.append(osc_bytes)
+        size += element_size
+    if elements:
+        yield _join_bundle(header, elements)
+
+
+def _join_bundle(header: bytes, elements: list[bytes | bytearray]) -> bytes:
+    if len(elements) == 1:
+        return bytes(elements[0])
+    parts = [header]
+    for osc_bytes in elements:
+        parts.append(_INT32.pack(len(osc_bytes)))
+        parts.append(osc_bytes)
+    return b"".join(parts)
+
+
+class OscSendBatcher(QObject):
+    """
+    Collects outgoing messages and sends them as bundles once the current event loop iteration is done or a time window
+    has passed. Only the last message for every address is kept, so a parameter written several times within a window
+    is only sent once with its latest value.
+    """
+
+    def __init__(self, write: Callable[[bytes], None], window_ms: int = 0, max_size: int = _MAX_DATAGRAM_SIZE):
+        """
+        :param write: sends a single datagram
+        :param window_ms: how long to collect messages. 0 collects until control returns to the event loop.
+        :param max_size: maximum size of a single bundle
+        """
+        super(QObject, self).__init__()
+        self.write = write
+        self.max_size = max_size
+        self._pending: dict[str, bytes] = {}
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(window_ms)
+        self._timer.timeout.connect(self.flush)
+
+    def set_window(self, window_ms: int) -> None:
+        self._timer.setInterval(window_ms)
+
+    def add(self, osc_path: str, osc_bytes: bytes | bytearray) -> None:
+        """
+        Queue a message. osc_bytes is copied, so reused buffers like the ones of OscMessageTemplate are fine.
+        """
+        self._pending[osc_path] = bytes(osc_bytes)
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def flush(self) -> None:
+        self._timer.stop()
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        for datagram in encode_osc_bundles(pending.values(), max_size=self.max_size):
+            self.write(datagram)
+
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+
+class ThreadedOscReceiver:
+    """
+    Receives and decodes datagrams on its own thread, so a busy GUI thread doesn't delay packet handling and a packet
+    burst doesn't stall the GUI. Decoded messages are handed over in batches, one per datagram, through a bounded
+    deque that the GUI thread drains. deque.append and deque.popleft are atomic, so no lock is needed. When the GUI
+    thread falls behind, the oldest batches are dropped and counted in dropped_count.
+    """
+
+    def __init__(self, ip: str, port: int, max_pending: int = 4096):
+        """
+        :param ip: address to bind to
+        :param port: port to bind to
+        :param max_pending: maximum number of batches waiting for the GUI thread
+        """
+        self.pending: deque[list[tuple[int, OscMessage]]] = deque()
+        self.max_pending = max_pending
+        self.received_count: int = 0
+        """Number of datagrams received since startup"""
+        self.malformed_count: int = 0
+        """Number of received datagrams that contained at least one malformed or unsupported message"""
+        self.dropped_count: int = 0
+        """Number of decoded messages thrown away because the GUI thread didn't drain them in time"""
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._socket.bind((ip, port))
+        # wake up regularly to notice stop()
+        self._socket.settimeout(0.25)
+        self._running = False
+        self._thread = threading.Thread(target=self._run, name="osc-receiver", daemon=True)
+
+    def start(self) -> None:
+        self._running = True
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._running = False
+        # close() may run after start() failed or was never called
+        if self._thread.is_alive():
+            self._thread.join()
+        self._socket.close()
+
+    def drain(self) -> Iterator[tuple[int, OscMessage]]:
+        """
+        Yield all messages received so far. Only call from a single thread.
+        """
+        pending = self.pending
+        while pending:
+            yield from pending.popleft()
+
+    def _run(self) -> None:
+        # a UDP datagram can't be larger than this, so nothing is ever truncated
+        buffer = bytearray(65536)
+        while self._running:
+            try:
+                size = self._socket.recv_into(buffer)
+            except TimeoutError:
+                continue
+            except OSError as e:
+                if self._running:
+                    log.error(f"Receiving OSC datagram failed: {e}")
+                continue
+            batch = []
+            malformed = False
+            for timetag, osc_msg in iter_osc_packet(buffer, 0, size):
+                if osc_msg is None:
+                    malformed = True
+                else:
+                    batch.append((timetag, osc_msg))
+            if malformed:
+                self.malformed_count += 1
+            if batch:
+                if len(self.pending) >= self.max_pending:
+                    try:
+                        self.dropped_count += len(self.pending.popleft())
+                    except IndexError:
+                        # drained by the GUI thread in the meantime
+                        pass
+                self.pending.append(batch)
+            # counted last, so whoever sees the datagram counted also sees it queued or counted as malformed
+            self.received_count += 1
 
 
 class VrcOscService(QObject):
@@ -81,13 +475,22 @@ class VrcOscService(QObject):
     Qt Networking API for UDP.
 
     Being limited to VRChat means:
-     1. only ",f", ",i", ",T", "F" (floats, ints, bools) are supported
-     2. bundles are not implemented
+     1. only ",f", ",i", ",T", ",F", ",s" (floats, ints, bools, strings) are supported. Strings are only sent by
+        VRChat itself, e.g. the avatar id on /avatar/change.
+     2. bundles are received, but their messages are dispatched right away unless a scheduler is enabled with
+        set_bundle_scheduling, which holds messages back until their timetag is due. Bundles are only sent when
+        batching is enabled with set_batching.
 
      Usage:
      Call set_handler and then connect. Packages are now received and handled via Qt Event system.
+     With set_batch_handler instead, all messages received together are handled in one call.
+     With connect(..., threaded=True) packages are received and decoded by a ThreadedOscReceiver instead and handled
+     once per frame on the thread of the service.
     """
 
+    encode_osc_message = staticmethod(encode_osc_message)
+    decode_osc_message = staticmethod(decode_osc_message)
+
     def __init__(self):
         super(QObject, self).__init__()
         self.out_port: int = 9000
@@ -95,30 +498,160 @@ class VrcOscService(QObject):
         self.in_port: int = 9001
         self.in_ip: QHostAddress = QHostAddress("127.0.0.1")
         self.handler: Optional[Callable[[OscMessage], None]] = None
+        self.batch_handler: Optional[Callable[[list[OscMessage]], None]] = None
+        self.bundle_scheduler: Optional[OscBundleScheduler] = None
+        self.send_batcher: Optional[OscSendBatcher] = None
+        self.received_count: int = 0
+        """Number of datagrams received since startup"""
+        self.malformed_count: int = 0
+        """Number of received datagrams that contained at least one malformed or unsupported message"""
+        self.truncated_count: int = 0
+        """Number of received datagrams that couldn't be read completely"""
+        self.receiver: Optional[ThreadedOscReceiver] = None
+        self._receiver_timer = QTimer(self)
+        self._receiver_timer.setInterval(_RECEIVER_DRAIN_INTERVAL_MS)
+        self._receiver_timer.timeout.connect(self._drain_receiver)
+        self._reported_drop_count = 0
         self.udp_socket = QUdpSocket(self)
         self.udp_socket.readyRead.connect(self._read_pending_diagrams)
 
     def send(self, path, value_type, value):
         osc_bytes = encode_osc_message((path, value_type, value))
-        self.udp_socket.writeDatagram(osc_bytes, self.out_ip, self.out_port)
+        if osc_bytes is not None:
+            self._send_message(path, osc_bytes)
+
+    def send_template(self, template: OscMessageTemplate, value: OscPyTypes) -> None:
+        """
+        Like send, but only packs the value into the already encoded message.
+        """
+        osc_bytes = template.pack(value)
+        if osc_bytes is not None:
+            self._send_message(template.osc_path, osc_bytes)
+
+    def set_batching(self, enabled: bool, window_ms: int = 0) -> None:
+        """
+        Enable or disable batching of outgoing messages into bundles. See OscSendBatcher.
+        Messages that are still queued are sent right away when disabling.
+        """
+        if enabled:
+            if self.send_batcher is None:
+                self.send_batcher = OscSendBatcher(self._write_datagram, window_ms)
+            else:
+                self.send_batcher.set_window(window_ms)
+        elif self.send_batcher is not None:
+            batcher, self.send_batcher = self.send_batcher, None
+            batcher.flush()
+
+    def _send_message(self, path: str, osc_bytes: bytes | bytearray) -> None:
+        if self.send_batcher is not None:
+            self.send_batcher.add(path, osc_bytes)
+        else:
+            self._write_datagram(osc_bytes)
+
+    def _write_datagram(self, datagram: bytes | bytearray) -> None:
+        self.udp_socket.writeDatagram(datagram, self.out_ip, self.out_port)
 
     def set_handler(self, handler: Callable[[OscMessage], None]) -> None:
         self.handler = handler
 
-    def connect(self, in_addr: QHostAddress, in_port: int, out_addr: QHostAddress, out_port: int):
+    def set_batch_handler(self, handler: Optional[Callable[[list[OscMessage]], None]]) -> None:
+        """
+        Hand all messages received together, those of a datagram or of one drain of the ThreadedOscReceiver, to the
+        handler in a single call. Takes precedence over the handler set with set_handler.
+        """
+        self.batch_handler = handler
+
+    def set_bundle_scheduling(self, enabled: bool) -> None:
+        """
+        Enable or disable holding back bundled messages until their timetag is due.
+        Messages that are still pending are dispatched right away when disabling.
+        """
+        if enabled and self.bundle_scheduler is None:
+            self.bundle_scheduler = OscBundleScheduler(self._handle_message)
+        elif not enabled and self.bundle_scheduler is not None:
+            scheduler, self.bundle_scheduler = self.bundle_scheduler, None
+            scheduler.flush()
+
+    def connect(self, in_addr: QHostAddress, in_port: int, out_addr: QHostAddress, out_port: int,
+                threaded: bool = False) -> bool:
+        """
+        :param threaded: receive and decode on a separate thread, see ThreadedOscReceiver
+        :return: False if the receiving port couldn't be bound, e.g. because it is in use. Sending still works.
+        """
         self.in_ip = in_addr
         self.in_port = in_port
         self.out_ip = out_addr
         self.out_port = out_port
-        self.udp_socket.bind(self.in_ip, self.in_port)
+        if threaded:
+            try:
+                self.receiver = ThreadedOscReceiver(self.in_ip.toString(), self.in_port)
+            except OSError as e:
+                log.error(f"Can't receive OSC messages on {self.in_ip.toString()}:{self.in_port}: {e}")
+                return False
+            self.receiver.start()
+            self._receiver_timer.start()
+        elif not self.udp_socket.bind(self.in_ip, self.in_port):
+            log.error(f"Can't receive OSC messages on {self.in_ip.toString()}:{self.in_port}: "
+                      f"{self.udp_socket.errorString()}")
+            return False
+        return True
+
+    def close(self) -> None:
+        """
+        Stop receiving. Queued outgoing messages are still sent.
+        """
+        self.set_batching(False)
+        if self.receiver is not None:
+            self._receiver_timer.stop()
+            self.receiver.stop()
+            self.receiver = None
+        self.udp_socket.close()
 
     def _read_pending_diagrams(self):
+        # drain everything, otherwise the rest of the queue has to wait for the next readyRead
         while self.udp_socket.hasPendingDatagrams():
+            size = self.udp_socket.pendingDatagramSize()
             data: bytes
-            (data, _, _) = self.udp_socket.readDatagram(1024)
-            osc_msg = decode_osc_message(data)
+            (data, _, _) = self.udp_socket.readDatagram(max(size, 0))
+            self.received_count += 1
+            if data is None or len(data) < size:
+                self.truncated_count += 1
+                continue
+            self._handle_packet(data)
+
+    def _drain_receiver(self) -> None:
+        self._dispatch_all(self.receiver.drain())
+        if self.receiver.dropped_count != self._reported_drop_count:
+            log.warning(f"GUI thread fell behind, dropped {self.receiver.dropped_count - self._reported_drop_count} "
+                        f"OSC messages ({self.receiver.dropped_count} in total)")
+            self._reported_drop_count = self.receiver.dropped_count
+
+    def _handle_packet(self, data: bytes) -> None:
+        messages = []
+        malformed = False
+        for timetag, osc_msg in iter_osc_packet(data):
             if osc_msg is None:
-                return
+                malformed = True
+            else:
+                messages.append((timetag, osc_msg))
+        if malformed:
+            self.malformed_count += 1
+        self._dispatch_all(messages)
+
+    def _dispatch_all(self, messages: Iterable[tuple[int, OscMessage]]) -> None:
+        batch = []
+        for timetag, osc_msg in messages:
+            if self.bundle_scheduler is not None and timetag != OSC_IMMEDIATELY:
+                self.bundle_scheduler.schedule(timetag, osc_msg)
+            elif self.batch_handler is not None:
+                batch.append(osc_msg)
+            else:
+                self._handle_message(osc_msg)
+        if batch:
+            self.batch_handler(batch)
 
-            if self.handler is not None:
-                self.handler(osc_msg)
+    def _handle_message(self, osc_msg: OscMessage) -> None:
+        if self.batch_handler is not None:
+            self.batch_handler([osc_msg])
+        elif self.handler is not None:
+            self.handler(osc_msg)
@@ -0,0 +1,57 @@
+"""
+Micro-benchmark for the OSC decoder. Not collected by the test runner, run it with
+
+    python -m test.bench_vrc_osc
+"""
+import struct
+import timeit
+
+from src.vrc_osc.vrc_osc import decode_osc_message, OSCValueType
+from test.test_vrc_osc import encoding_data
+
+
+def legacy_decode_osc_message(osc_bytes: bytes):
+    """The byte-by-byte decoder decode_osc_message replaced. Kept here as the baseline."""
+    i = 0
+    path_end = 0
+    while i < len(osc_bytes):
+        if osc_bytes[i] == 0:
+            path_end = i
+            break
+        i = i + 1
+    else:  # format violation
+        return
+
+    osc_path = osc_bytes[0:path_end].decode("unicode-escape")
+    j = 4 * (path_end // 4 + 1) + 1
+
+    match osc_bytes[j]:
+        case 84:  # b'T'[0]
+            return osc_path, OSCValueType.BOOL, True
+        case 70:  # b'F'[0]
+            return osc_path, OSCValueType.BOOL, False
+        case 105:  # b'i'[0]
+            return osc_path, OSCValueType.INT, struct.unpack(">i", osc_bytes[j + 3:j + 7])[0]
+        case 102:  # b'f'[0]
+            return osc_path, OSCValueType.FLOAT, struct.unpack(">f", osc_bytes[j + 3:j + 7])[0]
+
+
+def main(number: int = 100_000) -> None:
+    packets = [case[0] for case in encoding_data]
+    for packet in packets:
+        assert legacy_decode_osc_message(packet) == decode_osc_message(packet)
+
+    def run(decoder):
+        for packet in packets:
+            decoder(packet)
+
+    legacy = min(timeit.repeat(lambda: run(legacy_decode_osc_message), number=number, repeat=3))
+    current = min(timeit.repeat(lambda: run(decode_osc_message), number=number, repeat=3))
+    per_packet = 1e9 / (number * len(packets))
+    print(f"legacy:  {legacy * per_packet:8.1f} ns/packet")
+    print(f"current: {current * per_packet:8.1f} ns/packet")
+    print(f"speedup: {legacy / current:8.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,254 @@
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+from src.vrc_osc import OSCValueType
+from src.vrc_osc.avatar import Avatar, AvatarSchema, AvatarSchemaCache, DEFAULT_TYPE_DEADBANDS
+
+
+class RecordingOscService:
+
+    def __init__(self):
+        self.sent = []
+
+    def send_template(self, template, value):
+        self.sent.append((template.osc_path, value))
+
+
+def make_json_param(name: str, osc_type: str, controllable: bool = True) -> dict:
+    address = "/avatar/parameters/" + name
+    j_param = {"name": name, "output": {"address": address, "type": osc_type}}
+    if controllable:
+        j_param["input"] = {"address": address, "type": osc_type}
+    return j_param
+
+
+class TestAvatar(TestCase):
+
+    def setUp(self):
+        self.osc_service = RecordingOscService()
+        schema = AvatarSchema.from_json({"parameters": [
+            make_json_param("Toggle", OSCValueType.BOOL),
+            make_json_param("Outfit", OSCValueType.INT),
+            make_json_param("VelocityX", OSCValueType.FLOAT, controllable=False),
+        ]})
+        self.avatar = Avatar(self.osc_service, schema)
+        self.toggle, self.outfit, self.velocity = self.avatar.params
+
+    def test_load_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "avtr_1.json")
+            with open(filename, "w", encoding="utf-8") as file:
+                json.dump({"id": "avtr_1", "name": "Test", "parameters": [make_json_param("衣服", "Int")]}, file)
+            avatar = Avatar(self.osc_service)
+            avatar.load_vrchat_osc_file(filename)
+        self.assertEqual("avtr_1", avatar.avatar_id)
+        param = avatar.param_map["衣服"]
+        self.assertIs(param, avatar.osc_map["/avatar/parameters/衣服"])
+        self.assertEqual(OSCValueType.INT, param.osc_type)
+        self.assertEqual(0, param.value)
+        self.assertEqual(["衣服"], list(avatar.param_map))
+
+    def test_values_keep_their_type(self):
+        self.toggle.value = 1
+        self.outfit.value = 3.7
+        self.avatar.receive_osc_message(("/avatar/parameters/VelocityX", OSCValueType.FLOAT, 0.25))
+        self.assertIs(True, self.toggle.value)
+        self.assertEqual(3, self.outfit.value)
+        self.assertIsInstance(self.outfit.value, int)
+        self.assertEqual(0.25, self.velocity.value)
+        self.assertEqual([("/avatar/parameters/Toggle", True), ("/avatar/parameters/Outfit", 3)], self.osc_service.sent)
+
+    def test_sent_values_are_clamped(self):
+        self.outfit.value = 300
+        self.assertEqual(255, self.outfit.value)
+        self.velocity.value = float("nan")
+        self.assertEqual(0.0, self.velocity.value)
+        self.outfit.value = -1
+        self.assertEqual(("/avatar/parameters/Outfit", 0), self.osc_service.sent[-1])
+
+    def test_received_values_are_not_clamped(self):
+        received = []
+        self.velocity.subscribe(received.append)
+        self.velocity.receive_osc_value(3.5)
+        self.avatar.apply_many([("/avatar/parameters/VelocityX", -2.5)])
+        self.assertEqual([3.5, -2.5], received)
+
+    def test_invalid_values_are_ignored(self):
+        self.outfit.value = 5
+        with self.assertLogs("src.vrc_osc.avatar", "WARNING"):
+            self.outfit.value = "five"
+        with self.assertLogs("src.vrc_osc.avatar", "WARNING"):
+            self.outfit.value = float("inf")
+        with self.assertLogs("src.vrc_osc.avatar", "WARNING"):
+            self.avatar.apply_many([("/avatar/parameters/Outfit", float("inf"))])
+        self.assertEqual(5, self.outfit.value)
+
+    def test_apply_many(self):
+        received = []
+        self.velocity.subscribe(received.append)
+        self.outfit.subscribe(received.append)
+        self.avatar.apply_many([
+            ("/avatar/parameters/VelocityX", 0.5),
+            ("/avatar/parameters/Unknown", 1),
+            ("/avatar/parameters/Outfit", 999),
+            ("/avatar/parameters/VelocityX", 2.0),
+        ])
+        self.assertEqual([2.0, 999], received)
+        self.avatar.receive_osc_messages([("/avatar/parameters/Outfit", OSCValueType.INT, 3)])
+        self.assertEqual(3, self.outfit.value)
+        self.assertEqual([], self.osc_service.sent)
+
+    def test_subscribers(self):
+        received = []
+        subscriber = received.append
+        self.outfit.subscribe(subscriber)
+        self.outfit.value = 2
+        self.outfit.value = 2
+        self.toggle.value = True
+        self.outfit.unsubscribe(subscriber)
+        self.outfit.value = 5
+        self.assertEqual([2], received)
+
+    def test_unchanged_values_are_not_passed_on(self):
+        received = []
+        self.outfit.subscribe(received.append)
+        for value in (3, 3, 4, 4):
+            self.avatar.receive_osc_message(("/avatar/parameters/Outfit", OSCValueType.INT, value))
+        self.assertEqual([3, 4], received)
+
+    def test_deadband(self):
+        received = []
+        self.velocity.subscribe(received.append)
+        self.avatar.set_type_deadband(OSCValueType.FLOAT, 0.1)
+        for value in (0.5, 0.55, 0.58, 0.65, 0.05, 0.0):
+            self.avatar.receive_osc_message(("/avatar/parameters/VelocityX", OSCValueType.FLOAT, value))
+        # changes are measured against the last passed on value, 0 is always passed on
+        self.assertEqual([0.5, 0.65, 0.05, 0.0], received)
+        # suppressed values are still stored
+        self.avatar.receive_osc_message(("/avatar/parameters/VelocityX", OSCValueType.FLOAT, 0.02))
+        self.assertEqual(0.02, self.velocity.value)
+
+        self.velocity.deadband = 0.0
+        self.avatar.apply_many([("/avatar/parameters/VelocityX", 0.03)])
+        self.assertEqual(0.03, received[-1])
+        self.assertEqual(0.0, self.outfit.deadband)
+
+    def test_default_float_deadband(self):
+        received = []
+        self.velocity.subscribe(received.append)
+        for value in (0.3, 0.301, 0.299, 0.31, 0.001, 0.0):
+            self.avatar.receive_osc_message(("/avatar/parameters/VelocityX", OSCValueType.FLOAT, value))
+        self.assertEqual([0.3, 0.31, 0.001, 0.0], received)
+        self.assertEqual(DEFAULT_TYPE_DEADBANDS[OSCValueType.FLOAT], self.velocity.deadband)
+
+    def test_snapshot_diff_reset(self):
+        self.outfit.value = 4
+        snapshot = self.avatar.snapshot()
+        self.toggle.value = True
+        self.outfit.value = 7
+        self.assertEqual([self.toggle, self.outfit], self.avatar.diff(snapshot))
+
+        self.avatar.reset(snapshot)
+        self.assertEqual([], self.avatar.diff(snapshot))
+        self.assertIs(False, self.toggle.value)
+        self.assertEqual(4, self.outfit.value)
+
+        self.avatar.reset()
+        self.assertEqual(0, self.outfit.value)
+        self.assertEqual(("/avatar/parameters/Outfit", 0), self.osc_service.sent[-1])
+
+    def test_update_schema_keeps_state(self):
+        received = []
+        self.outfit.value = 3
+        self.outfit.selected = True
+        self.outfit.subscribe(received.append)
+        self.velocity.value = 0.5
+        self.outfit.deadband = 2
+        self.avatar.set_type_deadband(OSCValueType.BOOL, 0.5)
+        outfit = self.outfit
+
+        self.avatar.update_schema(AvatarSchema.from_json({"parameters": [
+            make_json_param("Hat", OSCValueType.BOOL),
+            make_json_param("Outfit", OSCValueType.INT),
+            make_json_param("VelocityX", OSCValueType.INT),
+        ]}))
+        self.assertIs(outfit, self.avatar.param_map["Outfit"])
+        self.assertEqual(1, outfit.slot)
+        self.assertEqual(3, outfit.value)
+        self.assertTrue(outfit.selected)
+        self.assertEqual(2, outfit.deadband)
+        self.assertEqual(0.5, self.avatar.param_map["Hat"].deadband)
+        # the type changed, so the old value doesn't apply anymore
+        self.assertEqual(0, self.avatar.param_map["VelocityX"].value)
+        self.assertNotIn("Toggle", self.avatar.param_map)
+        self.avatar.receive_osc_message(("/avatar/parameters/Outfit", OSCValueType.INT, 6))
+        self.assertEqual([6], received)
+
+    def test_update_schema_detaches_removed_params(self):
+        received = []
+        toggle, velocity = self.toggle, self.velocity
+        toggle.subscribe(received.append)
+        self.avatar.update_schema(AvatarSchema.from_json({"parameters": [
+            make_json_param("Hat", OSCValueType.BOOL),
+            make_json_param("VelocityX", OSCValueType.INT),
+            make_json_param("Outfit", OSCValueType.INT),
+        ]}))
+        self.assertTrue(toggle.detached)
+        self.assertTrue(velocity.detached)
+        self.assertFalse(self.avatar.param_map["Hat"].detached)
+        self.assertEqual("", toggle.name)
+        self.assertIsNone(toggle.value)
+        sent = list(self.osc_service.sent)
+        with self.assertLogs("src.vrc_osc.avatar", "WARNING"):
+            toggle.value = True
+        toggle.selected = True
+        # the slots of the removed parameters belong to Hat and VelocityX now
+        self.assertEqual(sent, self.osc_service.sent)
+        self.assertIs(False, self.avatar.param_map["Hat"].value)
+        self.assertFalse(self.avatar.param_map["Hat"].selected)
+        # unsubscribing from a detached view does nothing, its subscribers went away with its slot
+        toggle.unsubscribe(received.append)
+        self.assertEqual({}, self.avatar._subscribers)
+        self.avatar.receive_osc_message(("/avatar/parameters/Hat", OSCValueType.BOOL, True))
+        self.assertEqual([], received)
+
+
+class TestAvatarSchemaCache(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, "avtr_1.json")
+        self.write_config(["Toggle"])
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write_config(self, names: list[str]):
+        with open(self.filename, "w", encoding="utf-8") as file:
+            json.dump({"id": "avtr_1", "name": "Test",
+                       "parameters": [make_json_param(name, OSCValueType.BOOL) for name in names]}, file)
+
+    def test_shares_schema_until_file_changes(self):
+        cache = AvatarSchemaCache()
+        first = Avatar(RecordingOscService(), cache.load(self.filename))
+        second = Avatar(RecordingOscService(), cache.load(self.filename))
+        self.assertIs(first.schema, second.schema)
+        first.param_map["Toggle"].value = True
+        self.assertIs(False, second.param_map["Toggle"].value)
+
+        self.write_config(["Toggle", "Outfit"])
+        self.assertEqual(("Toggle", "Outfit"), cache.load(self.filename).names)
+
+    def test_sidecar(self):
+        cache_dir = os.path.join(self.directory.name, "cache")
+        schema = AvatarSchemaCache(cache_dir).load(self.filename)
+        self.assertEqual(1, len(os.listdir(cache_dir)))
+
+        # a new process would only read the sidecar
+        restored = AvatarSchemaCache(cache_dir).load(self.filename)
+        self.assertIsNot(schema, restored)
+        self.assertEqual(schema.names, restored.names)
+        self.assertEqual({"/avatar/parameters/Toggle": 0}, restored.slot_by_address)
+        self.assertEqual(b"/avatar/parameters/Toggle\x00\x00\x00,T\x00\x00", restored.templates[0].pack(True))
@@ -0,0 +1,75 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from PyQt6.QtCore import QBuffer, QIODevice
+from PyQt6.QtGui import QImage
+
+from src.avatar_cache import AvatarCache, AvatarData
+
+
+def make_avatar(avatar_id: str, thumbnail_size: int = 0) -> AvatarData:
+    data = AvatarData()
+    data.id = avatar_id
+    data.name = "Avatar " + avatar_id
+    data.thumbnail_url = "https://example.com/" + avatar_id + ".png"
+    data.thumbnail = b"\0" * thumbnail_size
+    data.etag = '"' + avatar_id + '"'
+    return data
+
+
+class TestAvatarCache(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, "avatars.sqlite3")
+        self.now = 1000.0
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def clock(self) -> float:
+        return self.now
+
+    def test_persists_thumbnail(self):
+        image = QImage(4, 3, QImage.Format.Format_RGB32)
+        buffer = QBuffer()
+        buffer.open(QIODevice.OpenModeFlag.WriteOnly)
+        image.save(buffer, "PNG")
+        data = make_avatar("avtr_1")
+        data.thumbnail = buffer.data().data()
+        cache = AvatarCache(self.filename)
+        cache.store(data)
+        cache.close()
+
+        cache = AvatarCache(self.filename)
+        cached = cache.get("avtr_1")
+        self.assertEqual("Avatar avtr_1", cached.name)
+        self.assertEqual('"avtr_1"', cached.etag)
+        self.assertEqual(4, cached.img.width())
+        # the decoded image is reused
+        self.assertIs(cached, cache.get("avtr_1"))
+        self.assertIsNone(cache.get("avtr_2"))
+        cache.close()
+
+    def test_freshness(self):
+        cache = AvatarCache(self.filename, max_age=60, clock=self.clock)
+        cache.store(make_avatar("avtr_1"))
+        self.now += 59
+        self.assertTrue(cache.is_fresh(cache.get("avtr_1")))
+        self.now += 1
+        self.assertFalse(cache.is_fresh(cache.get("avtr_1")))
+        cache.close()
+
+    def test_evicts_least_recently_used(self):
+        cache = AvatarCache(self.filename, max_bytes=250, max_memory_entries=1, clock=self.clock)
+        for avatar_id in ("avtr_1", "avtr_2"):
+            cache.store(make_avatar(avatar_id, 100))
+            self.now += 1
+        cache.get("avtr_1")
+        self.now += 1
+        cache.store(make_avatar("avtr_3", 100))
+        self.assertIsNotNone(cache.get("avtr_1"))
+        self.assertIsNone(cache.get("avtr_2"))
+        self.assertIsNotNone(cache.get("avtr_3"))
+        cache.close()
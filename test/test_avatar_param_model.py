@@ -0,0 +1,50 @@
+from unittest import TestCase
+
+from PyQt6.QtCore import Qt
+
+from src.ui.avatar_param_model import AvatarParamTableModel, AvatarParamFilterProxyModel, ParamFeature
+from src.vrc_osc import VrcOscService
+from src.vrc_osc.avatar import Avatar, AvatarSchema
+
+
+def make_json_param(name: str, controllable: bool) -> dict:
+    address = "/avatar/parameters/" + name
+    j_param = {"name": name, "output": {"address": address, "type": "Float"}}
+    if controllable:
+        j_param["input"] = {"address": address, "type": "Float"}
+    return j_param
+
+
+class TestAvatarParamFilterProxyModel(TestCase):
+
+    def setUp(self):
+        self.avatar = Avatar(VrcOscService(), AvatarSchema.from_json({"parameters": [
+            make_json_param("VF35_Go/Stationary", True),
+            make_json_param("Zipper", True),
+            make_json_param("AngularY", False),
+            make_json_param("Go/Locomotion", False),
+        ]}))
+        self.model = AvatarParamTableModel(self.avatar, lambda text, callback, from_lang: callback("en"))
+        self.proxy = AvatarParamFilterProxyModel()
+        self.proxy.setSourceModel(self.model)
+        self.proxy.sort(AvatarParamTableModel.COLUMN_NAME)
+
+    def visible_names(self) -> list[str]:
+        return [self.proxy.param_at(row).name for row in range(self.proxy.rowCount())]
+
+    def test_sorted_by_name(self):
+        self.assertEqual(["AngularY", "Go/Locomotion", "VF35_Go/Stationary", "Zipper"], self.visible_names())
+
+    def test_filter_mask(self):
+        self.proxy.set_filter_mask(ParamFeature.CONTROLLABLE, ParamFeature.SYSTEM_PREFIX)
+        self.assertEqual(["Zipper"], self.visible_names())
+        self.proxy.set_filter_mask(0, ParamFeature.CONTROLLABLE)
+        self.assertEqual(["AngularY", "Go/Locomotion"], self.visible_names())
+
+    def test_features_follow_selection_and_translation(self):
+        row = self.model.params.index(self.avatar.param_map["AngularY"])
+        self.model.setData(self.model.index(row, AvatarParamTableModel.COLUMN_SELECTED), Qt.CheckState.Checked,
+                           Qt.ItemDataRole.CheckStateRole)
+        self.model.translate(row)
+        self.proxy.set_filter_mask(ParamFeature.SELECTED | ParamFeature.TRANSLATED, 0)
+        self.assertEqual(["AngularY"], self.visible_names())
@@ -0,0 +1,74 @@
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+from src.vrc_osc.avatar import AvatarSchemaCache
+from src.vrc_osc.config_watcher import OscConfigWatcher, _ParseTask
+
+
+class SyncOscConfigWatcher(OscConfigWatcher):
+    """Parses on the calling thread, so the tests don't need an event loop"""
+
+    def _parse(self, path: str) -> None:
+        task = _ParseTask(path, self.schema_cache)
+        task.signals.done.connect(self._parsed)
+        task.signals.failed.connect(self._parse_failed)
+        task.run()
+
+
+class TestOscConfigWatcher(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.avatars_dir = os.path.join(self.directory.name, "usr_1", "Avatars")
+        os.makedirs(self.avatars_dir)
+        self.filename = os.path.join(self.avatars_dir, "avtr_1.json")
+        self.watcher = SyncOscConfigWatcher(self.directory.name, schema_cache=AvatarSchemaCache())
+        self.changed = []
+        self.watcher.config_changed.connect(lambda path, schema: self.changed.append((path, schema.names)))
+
+    def tearDown(self):
+        self.watcher.close()
+        self.directory.cleanup()
+
+    def write_config(self, content: str):
+        with open(self.filename, "w", encoding="utf-8") as file:
+            file.write(content)
+
+    def config(self, *names: str) -> str:
+        return json.dumps({"id": "avtr_1", "parameters": [
+            {"name": name, "output": {"address": "/avatar/parameters/" + name, "type": "Bool"}} for name in names
+        ]})
+
+    def test_new_config_is_parsed_once_stable(self):
+        self.write_config(self.config("Toggle"))
+        self.watcher._directory_changed(self.avatars_dir)
+        self.watcher._check_pending()
+        self.assertEqual([], self.changed)
+        self.watcher._check_pending()
+        self.assertEqual([(self.filename, ("Toggle",))], self.changed)
+        self.assertEqual({}, self.watcher._pending)
+
+    def test_changes_restart_debounce(self):
+        self.write_config(self.config("Toggle"))
+        self.watcher._directory_changed(self.avatars_dir)
+        self.watcher._check_pending()
+        self.write_config(self.config("Toggle", "Outfit"))
+        self.watcher._check_pending()
+        self.assertEqual([], self.changed)
+        self.watcher._check_pending()
+        self.assertEqual([(self.filename, ("Toggle", "Outfit"))], self.changed)
+
+    def test_unfinished_config_is_retried(self):
+        self.write_config(self.config("Toggle")[:20])
+        self.watcher._file_changed(self.filename)
+        self.watcher._check_pending()
+        self.watcher._check_pending()
+        self.assertEqual([], self.changed)
+        self.assertIn(self.filename, self.watcher._pending)
+
+        self.write_config(self.config("Toggle"))
+        self.watcher._check_pending()
+        self.watcher._check_pending()
+        self.assertEqual([(self.filename, ("Toggle",))], self.changed)
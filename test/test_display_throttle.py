@@ -0,0 +1,26 @@
+from unittest import TestCase
+
+from src.ui.display_throttle import DisplayThrottle
+
+
+class TestDisplayThrottle(TestCase):
+
+    def setUp(self):
+        self.throttle = DisplayThrottle(30.0)
+        self.shown: dict[str, list] = {"a": [], "b": []}
+
+    def test_only_latest_value_is_delivered(self):
+        for value in range(100):
+            self.throttle.post(self.shown["a"].append, value)
+        self.throttle.post(self.shown["b"].append, -1)
+        self.throttle.flush()
+        self.assertEqual([99], self.shown["a"])
+        self.assertEqual([-1], self.shown["b"])
+        self.throttle.flush()
+        self.assertEqual([99], self.shown["a"])
+
+    def test_discard(self):
+        self.throttle.post(self.shown["a"].append, 1)
+        self.throttle.discard(self.shown["a"].append)
+        self.throttle.flush()
+        self.assertEqual([], self.shown["a"])
@@ -0,0 +1,60 @@
+from unittest import TestCase
+
+from src.vrc_osc import OSCValueType
+from src.vrc_osc.router import OscRouter
+
+
+class TestOscRouter(TestCase):
+
+    def setUp(self):
+        self.router = OscRouter()
+        self.received: dict[str, list] = {"exact": [], "prefix": [], "all": []}
+        self.exact = self.received["exact"].append
+        self.prefix = self.received["prefix"].append
+        self.all = self.received["all"].append
+
+    def test_dispatch_only_reaches_matching_handlers(self):
+        self.router.subscribe(self.exact, "/avatar/parameters/VelocityX")
+        self.router.subscribe(self.prefix, "/avatar/parameters/*")
+        self.router.subscribe(self.all)
+        velocity = ("/avatar/parameters/VelocityX", OSCValueType.FLOAT, 0.5)
+        grounded = ("/avatar/parameters/Grounded", OSCValueType.BOOL, True)
+        change = ("/avatar/change", OSCValueType.INT, 0)
+        for osc_msg in (velocity, grounded, change):
+            self.router.dispatch(osc_msg)
+        self.assertEqual([velocity], self.received["exact"])
+        self.assertEqual([velocity, grounded], self.received["prefix"])
+        self.assertEqual([velocity, grounded, change], self.received["all"])
+
+    def test_unsubscribe_updates_routes(self):
+        self.router.subscribe_many(self.exact, ["/a", "/b"])
+        self.assertEqual((self.exact,), self.router.handlers_for("/a"))
+        self.router.unsubscribe(self.exact, "/a")
+        self.assertEqual((), self.router.handlers_for("/a"))
+        self.assertEqual((self.exact,), self.router.handlers_for("/b"))
+        with self.assertRaises(ValueError):
+            self.router.unsubscribe(self.exact, "/a")
+
+    def test_failing_handler_does_not_stop_dispatch(self):
+        def fail(_):
+            raise RuntimeError()
+
+        self.router.subscribe(fail, "/a")
+        self.router.subscribe(self.all)
+        with self.assertLogs("src.vrc_osc.router"):
+            self.router.dispatch(("/a", OSCValueType.INT, 1))
+        self.assertEqual(1, len(self.received["all"]))
+
+    def test_dispatch_many_batches_per_handler(self):
+        batches = []
+        self.router.subscribe_batch(batches.append, ["/a", "/b"])
+        self.router.subscribe(self.all)
+        a = ("/a", OSCValueType.INT, 1)
+        b = ("/b", OSCValueType.INT, 2)
+        c = ("/c", OSCValueType.INT, 3)
+        self.router.dispatch_many([a, c, b])
+        self.router.dispatch(a)
+        self.assertEqual([[a, b], [a]], batches)
+        self.assertEqual([a, c, b, a], self.received["all"])
+        self.router.unsubscribe_batch(batches.append, ["/a", "/b"])
+        self.assertEqual((self.all,), self.router.handlers_for("/a"))
@@ -0,0 +1,32 @@
+from unittest import TestCase
+
+from src.translation_backends import GlossaryBackend
+
+
+class TestGlossaryBackend(TestCase):
+
+    def setUp(self):
+        self.backend = GlossaryBackend({
+            ("zh", "en"): {"衣服": "clothes", "开关": "toggle", "开": "on", "红色": "red", "头发": "hair"},
+        })
+
+    def test_whole_terms(self):
+        self.assertEqual("toggle", self.backend.translate("开关", "zh", "en"))
+        self.assertEqual("on", self.backend.translate("开", "zh", "en"))
+        self.assertEqual("red/hair", self.backend.translate("红色/头发", "zh", "en"))
+
+    def test_runs_of_several_terms_are_left_to_other_backends(self):
+        self.assertIsNone(self.backend.translate("红色头发", "zh", "en"))
+        self.assertIsNone(self.backend.translate("开衣服", "zh", "en"))
+        self.assertIsNone(self.backend.translate("开开", "zh", "en"))
+
+    def test_keeps_name_structure(self):
+        self.assertEqual("VF35_clothes/toggle", self.backend.translate("VF35_衣服/开关", "zh", "en"))
+
+    def test_unknown_terms_are_left_to_other_backends(self):
+        self.assertIsNone(self.backend.translate("衣服/上衣", "zh", "en"))
+        self.assertIsNone(self.backend.translate("VF35_Toggle", "zh", "en"))
+        self.assertIsNone(self.backend.translate("衣服", "ko", "en"))
+
+    def test_autodetect_uses_all_glossaries(self):
+        self.assertEqual("clothes", self.backend.translate("衣服", "autodetect", "en"))
@@ -0,0 +1,101 @@
+import os
+import sqlite3
+import tempfile
+from unittest import TestCase
+
+from src.my_translator import TranslationCache
+
+
+class TestTranslationCache(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, "translations.sqlite3")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_migrates_unkeyed_table(self):
+        con = sqlite3.connect(self.filename)
+        con.execute("CREATE TABLE translation_cache(phrase, translation, from_lang, to_lang);")
+        con.executemany("INSERT INTO translation_cache VALUES (?, ?, ?, ?)", [
+            ("衣服", "clothes", "zh", "en"),
+            ("衣服", "clothing", "zh", "en"),
+            ("头发", "hair", "zh", "en"),
+        ])
+        con.commit()
+        con.close()
+
+        cache = TranslationCache(self.filename)
+        self.assertEqual("clothing", cache.lookup("衣服", "zh", "en"))
+        self.assertEqual("hair", cache.lookup("头发", "zh", "en"))
+        self.assertIsNone(cache.lookup("头发", "ko", "en"))
+        self.assertEqual(2, cache.con.execute("SELECT COUNT(*) FROM translation_cache").fetchone()[0])
+        cache.close()
+
+        # opening an already migrated file again must not touch the data
+        cache = TranslationCache(self.filename)
+        self.assertEqual("clothing", cache.lookup("衣服", "zh", "en"))
+        cache.close()
+
+    def test_migrates_jp_to_ja(self):
+        cache = TranslationCache(self.filename)
+        cache.con.executemany("INSERT INTO translation_cache VALUES (?, ?, ?, ?)", [
+            ("髪", "jp", "en", "hair"),
+            ("服", "jp", "en", "clothes (old)"),
+            ("服", "ja", "en", "clothes"),
+        ])
+        cache.con.execute("PRAGMA user_version = 1")
+        cache.close()
+
+        cache = TranslationCache(self.filename)
+        self.assertEqual("hair", cache.lookup("髪", "ja", "en"))
+        self.assertEqual("clothes", cache.lookup("服", "ja", "en"))
+        self.assertEqual(0, cache.con.execute(
+            "SELECT COUNT(*) FROM translation_cache WHERE from_lang = 'jp'"
+        ).fetchone()[0])
+        cache.close()
+
+    def test_store_replaces_and_commits_in_batches(self):
+        cache = TranslationCache(self.filename, max_pending=2)
+        reader = sqlite3.connect(self.filename)
+        count = "SELECT COUNT(*) FROM translation_cache"
+
+        cache.store("衣服", "clothes", "zh", "en")
+        self.assertEqual(0, reader.execute(count).fetchone()[0])
+        cache.store("衣服", "clothing", "zh", "en")
+        self.assertEqual(1, reader.execute(count).fetchone()[0])
+        self.assertEqual("clothing", cache.lookup("衣服", "zh", "en"))
+
+        cache.store("头发", "hair", "zh", "en")
+        cache.close()
+        self.assertEqual(2, reader.execute(count).fetchone()[0])
+        reader.close()
+
+    def test_memory_hits_skip_the_database(self):
+        cache = TranslationCache(self.filename, max_memory_entries=2)
+        cache.store("衣服", "clothes", "zh", "en")
+        cache.store("头发", "hair", "zh", "en")
+        cache.store("上衣", "top", "zh", "en")
+        cache.commit()
+        self.assertEqual("hair", cache.lookup("头发", "zh", "en"))
+        self.assertEqual((1, 0), (cache.hits, cache.misses))
+        # evicted from memory, but still in the database
+        self.assertEqual("clothes", cache.lookup("衣服", "zh", "en"))
+        self.assertEqual((1, 1), (cache.hits, cache.misses))
+        self.assertNotIn(("上衣", "zh", "en"), cache.memory)
+        cache.close()
+
+    def test_warm(self):
+        cache = TranslationCache(self.filename)
+        cache.store("衣服", "clothes", "zh", "en")
+        cache.store("头发", "hair", "zh", "en")
+        cache.store("头发", "Haare", "zh", "de")
+        cache.close()
+
+        cache = TranslationCache(self.filename)
+        cache.warm(["衣服", "头发", "开关"], "zh", "en")
+        self.assertEqual({("衣服", "zh", "en"): "clothes", ("头发", "zh", "en"): "hair"}, dict(cache.memory))
+        self.assertEqual("hair", cache.lookup("头发", "zh", "en"))
+        self.assertEqual((1, 0), (cache.hits, cache.misses))
+        cache.close()
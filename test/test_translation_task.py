@@ -0,0 +1,38 @@
+from unittest import TestCase
+
+from src.my_translator import _TranslationTask
+from src.translation_backends import RemoteTranslatorBackend
+
+
+class FakeTranslator:
+    def __init__(self, keep_lines: bool = True):
+        self.keep_lines = keep_lines
+        self.requests: list[str] = []
+
+    def translate(self, text: str) -> str:
+        self.requests.append(text)
+        translation = text.replace("衣服", "clothes").replace("头发", "hair")
+        return translation if self.keep_lines else translation.replace("\n", " ")
+
+
+class TestTranslationTask(TestCase):
+
+    def run_task(self, tl: FakeTranslator, phrases: list[str]) -> list[tuple[str, str]]:
+        results = []
+        backend = RemoteTranslatorBackend(lambda from_lang, to_lang: tl)
+        task = _TranslationTask(phrases, backend, "zh", "en")
+        task.signals.done.connect(results.extend)
+        task.run()
+        return results
+
+    def test_batch_is_one_request(self):
+        tl = FakeTranslator()
+        results = self.run_task(tl, ["衣服", "头发"])
+        self.assertEqual([("衣服", "clothes"), ("头发", "hair")], results)
+        self.assertEqual(["衣服\n头发"], tl.requests)
+
+    def test_merged_lines_fall_back_to_single_requests(self):
+        tl = FakeTranslator(keep_lines=False)
+        results = self.run_task(tl, ["衣服", "头发"])
+        self.assertEqual([("衣服", "clothes"), ("头发", "hair")], results)
+        self.assertEqual(["衣服\n头发", "衣服", "头发"], tl.requests)
@@ -0,0 +1,45 @@
+from unittest import TestCase
+
+from src import utils
+
+
+class TestSplitNameSegments(TestCase):
+
+    def test_split(self):
+        self.assertEqual(["VF35", "_", "衣服", "/", "上衣", "/", "开关"], utils.split_name_segments("VF35_衣服/上衣/开关"))
+        self.assertEqual(["Go", "/", "Stationary"], utils.split_name_segments("Go/Stationary"))
+        self.assertEqual(["开关", "A"], utils.split_name_segments("开关A"))
+        self.assertEqual([], utils.split_name_segments(""))
+
+    def test_roundtrip(self):
+        for name in ("VF35_衣服/上衣/开关", "_a__b/", "スカート_Toggle", "머리 길이"):
+            self.assertEqual(name, "".join(utils.split_name_segments(name)))
+
+    def test_join_translated_segments(self):
+        translated = {"衣服": "clothes", "开关": "switch"}
+        self.assertEqual("VF35_clothes/switch",
+                         utils.join_name_segments(utils.split_name_segments("VF35_衣服/开关"), translated))
+        self.assertEqual("switch A", utils.join_name_segments(utils.split_name_segments("开关A"), translated))
+        translated = {"帽子": "hat", "颜色": "color"}
+        self.assertEqual("Hat hat/color Color",
+                         utils.join_name_segments(utils.split_name_segments("Hat 帽子/颜色 Color"), translated))
+
+
+class TestClassifyScripts(TestCase):
+
+    def test_classify(self):
+        names = ["VF35_衣服/开关", "スカート_Toggle", "髪の毛", "머리", "Go/Stationary", "", "开关"]
+        self.assertEqual([
+            utils.Script.LATIN | utils.Script.HAN,
+            utils.Script.KANA | utils.Script.LATIN,
+            utils.Script.HAN | utils.Script.KANA,
+            utils.Script.HANGUL,
+            utils.Script.LATIN,
+            utils.Script(0),
+            utils.Script.HAN,
+        ], utils.classify_scripts(names))
+
+    def test_source_language(self):
+        names = ["VF35_衣服/开关", "スカート_Toggle", "髪の毛", "머리", "Go/Stationary"]
+        self.assertEqual(["zh", "ja", "ja", "ko", None],
+                         [utils.source_language(scripts) for scripts in utils.classify_scripts(names)])
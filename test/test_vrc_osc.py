@@ -1,6 +1,12 @@
+import socket
+import struct
+import time
 from unittest import TestCase
 
-from src.vrc_osc import OSCValueType, VrcOscService
+from PyQt6.QtNetwork import QHostAddress
+
+from src.vrc_osc import OSCValueType, OscMessageTemplate, VrcOscService, OscBundleScheduler, OscSendBatcher, \
+    ThreadedOscReceiver, OSC_IMMEDIATELY, encode_osc_bundles, iter_osc_packet, osc_timetag_to_time
 
 # \u8863\u670d = 衣服 are chinese characters used by many avatars. Proper handling is necessary
 encoding_data: list[tuple[bytes, str, OSCValueType, bool | float | int]] = [
@@ -50,6 +56,13 @@ encoding_data: list[tuple[bytes, str, OSCValueType, bool | float | int]] = [
     )]
 
 
+def make_bundle(timetag: int, *elements: bytes) -> bytes:
+    bundle = b"#bundle\x00" + struct.pack(">Q", timetag)
+    for element in elements:
+        bundle += struct.pack(">i", len(element)) + element
+    return bundle
+
+
 class TestVrcOscService(TestCase):
 
     def test_encode_osc_message_0(self):
@@ -87,3 +100,208 @@ class TestVrcOscService(TestCase):
         self.assertEqual(osc_path, osc_path_2)
         self.assertEqual(osc_type, osc_type_2)
         self.assertEqual(osc_value, osc_value_2)
+
+    def test_decode_osc_message_with_offset(self):
+        osc_bin, osc_path, osc_type, osc_value = encoding_data[2]
+        padded = b"\xaa" * 8 + osc_bin + b"\xbb" * 4
+        decoded = VrcOscService.decode_osc_message(padded, 8, 8 + len(osc_bin))
+        self.assertEqual((osc_path, osc_type, osc_value), decoded)
+
+    def test_decode_osc_message_truncated(self):
+        osc_bin = encoding_data[3][0]
+        self.assertIsNone(VrcOscService.decode_osc_message(osc_bin[:-2]))
+        self.assertIsNone(VrcOscService.decode_osc_message(osc_bin[:31]))
+
+    def test_decode_osc_string(self):
+        osc_bin = b"/avatar/change\x00\x00,s\x00\x00avtr_1234\x00\x00\x00"
+        self.assertEqual(osc_bin, VrcOscService.encode_osc_message(("/avatar/change", OSCValueType.STRING, "avtr_1234")))
+        self.assertEqual(("/avatar/change", OSCValueType.STRING, "avtr_1234"), VrcOscService.decode_osc_message(osc_bin))
+        # missing terminator
+        self.assertIsNone(VrcOscService.decode_osc_message(osc_bin[:-3]))
+
+    def test_decode_osc_message_interns_address(self):
+        first = VrcOscService.decode_osc_message(encoding_data[0][0])
+        second = VrcOscService.decode_osc_message(bytearray(encoding_data[1][0]))
+        self.assertIs(first[0], second[0])
+
+    def test_message_template(self):
+        for osc_bin, osc_path, osc_type, osc_value in encoding_data:
+            template = OscMessageTemplate(osc_path, osc_type)
+            self.assertEqual(osc_bin, bytes(template.pack(osc_value)))
+
+    def test_message_template_reuses_buffer(self):
+        template = OscMessageTemplate("/avatar/parameters/VelocityX", OSCValueType.FLOAT)
+        first = template.pack(0.5)
+        second = template.pack(-0.25)
+        self.assertIs(first, second)
+        self.assertEqual(VrcOscService.encode_osc_message(("/avatar/parameters/VelocityX", OSCValueType.FLOAT, -0.25)),
+                         bytes(second))
+
+    def test_message_template_bool(self):
+        template = OscMessageTemplate("/avatar/parameters/Go/Stationary", OSCValueType.BOOL)
+        for value in (True, False):
+            self.assertEqual(
+                VrcOscService.encode_osc_message(("/avatar/parameters/Go/Stationary", OSCValueType.BOOL, value)),
+                template.pack(value)
+            )
+
+    def test_iter_osc_packet_message(self):
+        osc_bin, osc_path, osc_type, osc_value = encoding_data[3]
+        self.assertEqual([(OSC_IMMEDIATELY, (osc_path, osc_type, osc_value))], list(iter_osc_packet(osc_bin)))
+
+    def test_iter_osc_packet_nested_bundle(self):
+        inner = make_bundle(2 << 32, encoding_data[2][0], encoding_data[3][0])
+        outer = make_bundle(OSC_IMMEDIATELY, encoding_data[0][0], inner, encoding_data[1][0])
+        expected = [
+            (OSC_IMMEDIATELY, encoding_data[0][1:]),
+            (2 << 32, encoding_data[2][1:]),
+            (2 << 32, encoding_data[3][1:]),
+            (OSC_IMMEDIATELY, encoding_data[1][1:]),
+        ]
+        self.assertEqual(expected, list(iter_osc_packet(outer)))
+
+    def test_iter_osc_packet_malformed_bundle(self):
+        bundle = make_bundle(OSC_IMMEDIATELY, encoding_data[0][0])
+        bundle += struct.pack(">i", 64) + encoding_data[1][0]
+        elements = list(iter_osc_packet(bundle))
+        self.assertEqual((OSC_IMMEDIATELY, encoding_data[0][1:]), elements[0])
+        self.assertEqual((OSC_IMMEDIATELY, None), elements[1])
+        self.assertEqual(2, len(elements))
+
+    def test_osc_timetag_to_time(self):
+        self.assertEqual(0.0, osc_timetag_to_time(2208988800 << 32))
+        self.assertEqual(1.5, osc_timetag_to_time((2208988801 << 32) | 0x80000000))
+
+
+class TestOscBundleScheduler(TestCase):
+
+    def setUp(self):
+        self.now = 100.0
+        self.dispatched = []
+        self.scheduler = OscBundleScheduler(self.dispatched.append, clock=lambda: self.now)
+
+    @staticmethod
+    def timetag(unix_time: float) -> int:
+        return int((unix_time + 2208988800) * 0x100000000)
+
+    def test_due_messages_are_dispatched_immediately(self):
+        self.scheduler.schedule(OSC_IMMEDIATELY, encoding_data[0][1:])
+        self.scheduler.schedule(self.timetag(99.0), encoding_data[1][1:])
+        self.assertEqual([encoding_data[0][1:], encoding_data[1][1:]], self.dispatched)
+        self.assertEqual(0, self.scheduler.pending_count())
+
+    def test_future_messages_are_dispatched_in_timetag_order(self):
+        self.scheduler.schedule(self.timetag(100.5), encoding_data[0][1:])
+        self.scheduler.schedule(self.timetag(100.25), encoding_data[1][1:])
+        self.scheduler.schedule(self.timetag(100.25), encoding_data[2][1:])
+        self.assertEqual([], self.dispatched)
+        self.now = 100.3
+        self.scheduler.dispatch_due()
+        self.assertEqual([encoding_data[1][1:], encoding_data[2][1:]], self.dispatched)
+        self.scheduler.flush()
+        self.assertEqual(encoding_data[0][1:], self.dispatched[-1])
+        self.assertEqual(0, self.scheduler.pending_count())
+
+
+class TestOscSendBatcher(TestCase):
+
+    def setUp(self):
+        self.datagrams = []
+        self.batcher = OscSendBatcher(self.datagrams.append)
+
+    def test_encode_osc_bundles_roundtrip(self):
+        messages = [case[0] for case in encoding_data]
+        bundles = list(encode_osc_bundles(messages))
+        self.assertEqual(1, len(bundles))
+        self.assertEqual([(OSC_IMMEDIATELY, case[1:]) for case in encoding_data], list(iter_osc_packet(bundles[0])))
+
+    def test_encode_osc_bundles_max_size(self):
+        messages = [case[0] for case in encoding_data] * 10
+        bundles = list(encode_osc_bundles(messages, max_size=128))
+        self.assertTrue(all(len(bundle) <= 128 for bundle in bundles))
+        decoded = [osc_msg for bundle in bundles for _, osc_msg in iter_osc_packet(bundle)]
+        self.assertEqual([case[1:] for case in encoding_data] * 10, decoded)
+
+    def test_single_message_is_not_bundled(self):
+        self.assertEqual([encoding_data[0][0]], list(encode_osc_bundles([encoding_data[0][0]])))
+
+    def test_writes_to_the_same_address_collapse(self):
+        template = OscMessageTemplate("/avatar/parameters/VelocityX", OSCValueType.FLOAT)
+        for value in (0.25, 0.5, 0.75):
+            self.batcher.add(template.osc_path, template.pack(value))
+        self.batcher.add(encoding_data[2][1], encoding_data[2][0])
+        self.assertEqual(2, self.batcher.pending_count())
+        self.batcher.flush()
+        self.assertEqual(1, len(self.datagrams))
+        decoded = [osc_msg for _, osc_msg in iter_osc_packet(self.datagrams[0])]
+        self.assertEqual([("/avatar/parameters/VelocityX", OSCValueType.FLOAT, 0.75), encoding_data[2][1:]], decoded)
+
+
+class TestVrcOscServiceReceive(TestCase):
+
+    def setUp(self):
+        self.received = []
+        self.service = VrcOscService()
+        self.service.set_handler(self.received.append)
+
+    def test_malformed_packet_does_not_stop_dispatch(self):
+        self.service._handle_packet(b"garbage")
+        self.service._handle_packet(encoding_data[0][0])
+        self.assertEqual([encoding_data[0][1:]], self.received)
+        self.assertEqual(1, self.service.malformed_count)
+
+    def test_malformed_bundle_element_keeps_the_rest(self):
+        self.service._handle_packet(make_bundle(OSC_IMMEDIATELY, b"garbage\x00", encoding_data[1][0]))
+        self.assertEqual([encoding_data[1][1:]], self.received)
+        self.assertEqual(1, self.service.malformed_count)
+
+    def test_batch_handler_gets_whole_bundles(self):
+        batches = []
+        self.service.set_batch_handler(batches.append)
+        self.service._handle_packet(make_bundle(OSC_IMMEDIATELY, encoding_data[0][0], encoding_data[1][0]))
+        self.service._handle_packet(encoding_data[2][0])
+        self.assertEqual([[encoding_data[0][1:], encoding_data[1][1:]], [encoding_data[2][1:]]], batches)
+        self.assertEqual([], self.received)
+
+
+class TestThreadedOscReceiver(TestCase):
+
+    def setUp(self):
+        self.receiver = ThreadedOscReceiver("127.0.0.1", 0, max_pending=2)
+        self.address = self.receiver._socket.getsockname()
+        self.sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def tearDown(self):
+        self.sender.close()
+        self.receiver.stop()
+
+    def test_bind_failure_is_reported(self):
+        port = self.address[1]
+        for threaded in (True, False):
+            service = VrcOscService()
+            with self.assertLogs("src.vrc_osc.vrc_osc", "ERROR"):
+                connected = service.connect(QHostAddress("127.0.0.1"), port, QHostAddress("127.0.0.1"), 9000,
+                                            threaded=threaded)
+            self.assertFalse(connected)
+            self.assertIsNone(service.receiver)
+            service.close()
+
+    def wait_for_datagrams(self, count: int):
+        deadline = time.monotonic() + 2.0
+        while self.receiver.received_count < count and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(count, self.receiver.received_count)
+
+    def test_overflow_drops_oldest(self):
+        self.receiver.start()
+        for case in encoding_data:
+            self.sender.sendto(case[0], self.address)
+        self.sender.sendto(b"garbage", self.address)
+        self.wait_for_datagrams(5)
+        self.assertEqual([(OSC_IMMEDIATELY, case[1:]) for case in encoding_data[2:]], list(self.receiver.drain()))
+        self.assertEqual(2, self.receiver.dropped_count)
+        self.assertEqual(1, self.receiver.malformed_count)
+
+    def test_stop_without_start(self):
+        # tearDown stops the receiver that was never started
+        self.assertFalse(self.receiver._thread.is_alive())